@@ -0,0 +1,216 @@
+# array_backend.py
+import importlib.util
+import logging
+import threading
+import time
+import numpy as np
+from utils import metrics
+
+class ArrayBackend:
+    """Execution engine for the numeric work in preprocessing, the VAD and the spectrogram.
+
+    Buffers are float32 arrays of the backend's array module (``xp``). Elementwise
+    methods return their result. In-place backends write into the first argument
+    and return it, so callers always use the return value.
+    """
+
+    name = "base"
+    requires = None  # Optional package the backend needs
+
+    def __init__(self):
+        self.xp = np
+
+    def to_device(self, array):
+        return self.xp.asarray(array, dtype=self.xp.float32)
+
+    def to_host(self, array):
+        return array
+
+    def multiply(self, buffer, factor):
+        return buffer * np.float32(factor)
+
+    def peak(self, buffer):
+        return float(self.xp.abs(buffer).max()) if len(buffer) else 0.0
+
+    def clip_int16(self, buffer):
+        return self.xp.clip(buffer, -32768, 32767)
+
+    def frame_rms(self, frames):
+        """RMS of each row of an int16 (frames, size) array, as a host float32 array."""
+        frames = self.to_device(frames)
+        return self.to_host(self.xp.sqrt(self.xp.mean(frames * frames, axis=1)))
+
+    def rfft(self, frames, n=None):
+        return self.xp.fft.rfft(frames, n=n, axis=1)
+
+    def irfft(self, spectrum, n):
+        return self.xp.fft.irfft(spectrum, n=n, axis=1).astype(self.xp.float32)
+
+    def subtract_noise(self, spectrum, noise, strength, floor):
+        """Scale each bin so its magnitude drops by strength * noise, but not below floor * magnitude."""
+        magnitude = self.xp.abs(spectrum)
+        reduced = self.xp.maximum(magnitude - strength * noise, floor * magnitude)
+        return spectrum * (reduced / self.xp.maximum(magnitude, 1e-12))
+
+    def power_db(self, spectrum, reference):
+        power = self.xp.abs(spectrum)
+        return 10.0 * self.xp.log10(power * power / reference + 1e-12)
+
+class NumpyBackend(ArrayBackend):
+    """Plain NumPy expressions, allocating a new array for every step."""
+
+    name = "numpy"
+
+class NumpyInplaceBackend(ArrayBackend):
+    """NumPy with float32 buffers updated in place through ``out=`` wherever possible."""
+
+    name = "numpy_inplace"
+
+    def multiply(self, buffer, factor):
+        return np.multiply(buffer, np.float32(factor), out=buffer)
+
+    def clip_int16(self, buffer):
+        return np.clip(buffer, -32768, 32767, out=buffer)
+
+    def frame_rms(self, frames):
+        return np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+    def subtract_noise(self, spectrum, noise, strength, floor):
+        magnitude = np.abs(spectrum)
+        reduced = magnitude - np.float32(strength) * noise
+        np.maximum(reduced, np.multiply(magnitude, np.float32(floor)), out=reduced)
+        np.divide(reduced, magnitude, out=reduced, where=magnitude > 0)
+        spectrum *= reduced
+        return spectrum
+
+class NumexprBackend(NumpyInplaceBackend):
+    """Elementwise work compiled and multithreaded by numexpr; FFTs stay in NumPy."""
+
+    name = "numexpr"
+    requires = "numexpr"
+
+    def __init__(self):
+        super().__init__()
+        import numexpr
+        self.numexpr = numexpr
+
+    def multiply(self, buffer, factor):
+        factor = np.float32(factor)
+        return self.numexpr.evaluate("buffer * factor", out=buffer, casting="same_kind")
+
+    def frame_rms(self, frames):
+        frames = frames.astype(np.float32)
+        return np.sqrt(self.numexpr.evaluate("sum(frames * frames, axis=1)") / frames.shape[1]).astype(np.float32)
+
+    def subtract_noise(self, spectrum, noise, strength, floor):
+        magnitude = np.abs(spectrum)
+        strength, floor = np.float32(strength), np.float32(floor)
+        scale = self.numexpr.evaluate(
+            "where(magnitude > 0, where(magnitude - strength * noise > floor * magnitude, "
+            "magnitude - strength * noise, floor * magnitude) / magnitude, 0)"
+        )
+        spectrum *= scale
+        return spectrum
+
+class CupyBackend(ArrayBackend):
+    """CuPy on the GPU. Worth it for long buffers; each call pays a host/device transfer."""
+
+    name = "cupy"
+    requires = "cupy"
+
+    def __init__(self):
+        super().__init__()
+        import cupy
+        self.xp = cupy
+
+    def to_host(self, array):
+        return self.xp.asnumpy(array)
+
+    def multiply(self, buffer, factor):
+        buffer *= np.float32(factor)
+        return buffer
+
+    def clip_int16(self, buffer):
+        return self.xp.clip(buffer, -32768, 32767, out=buffer)
+
+ARRAY_BACKENDS = {
+    NumpyBackend.name: NumpyBackend,
+    NumpyInplaceBackend.name: NumpyInplaceBackend,
+    NumexprBackend.name: NumexprBackend,
+    CupyBackend.name: CupyBackend,
+}
+
+# The original CPU/GPU choices map onto the fastest backend of each kind
+_ALIASES = {"cpu": NumpyInplaceBackend.name, "gpu": CupyBackend.name}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_array_backend(name="CPU"):
+    """Return the named backend, falling back to in-place NumPy when it is unknown or not installed."""
+    key = _ALIASES.get(str(name).lower(), str(name).lower())
+    with _instances_lock:
+        backend = _instances.get(key)
+        if backend is None:
+            backend = _instances[key] = _create_backend(key)
+        return backend
+
+def _create_backend(key):
+    backend_class = ARRAY_BACKENDS.get(key)
+    if backend_class is None:
+        logging.warning(f"Unknown processing backend '{key}'. Using CPU.")
+        return NumpyInplaceBackend()
+    try:
+        backend = backend_class()
+    except ImportError as e:
+        logging.warning(f"Processing backend '{key}' is unavailable ({e}). Falling back to CPU.")
+        return NumpyInplaceBackend()
+    logging.info(f"Processing backend: {key}")
+    return backend
+
+def available_array_backends():
+    """Names of the backends whose packages are installed, found without importing them."""
+    return [
+        name for name, backend_class in ARRAY_BACKENDS.items()
+        if backend_class.requires is None or importlib.util.find_spec(backend_class.requires) is not None
+    ]
+
+def benchmark_array_backends(names=None, seconds=5.0, sample_rate=16000, repeats=3):
+    """Run the preprocessing pipeline and VAD energy on noise with each backend and report throughput.
+
+    Returns {name: {"msamples_per_s": ..., "realtime_factor": ...}}. Backends that
+    cannot be imported report {"available": False}.
+    """
+    from audio.preprocessing import SpectralSubtractionStage, NormalizeStage, PreprocessingPipeline
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 3000, int(seconds * sample_rate)).astype(np.int16)
+    noise_profile = np.full(257, 1000.0, dtype=np.float32)
+    frame = int(sample_rate * 0.03)
+    results = {}
+    for name in names or ARRAY_BACKENDS:
+        try:
+            backend = ARRAY_BACKENDS[name]()
+        except ImportError:
+            results[name] = {"available": False}
+            continue
+        pipeline = PreprocessingPipeline(
+            [SpectralSubtractionStage(noise_profile), NormalizeStage()], backend
+        )
+        pipeline.process(samples)  # Warm up caches, plans and kernels
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            pipeline.process(samples)
+            backend.frame_rms(samples[:len(samples) // frame * frame].reshape(-1, frame))
+            best = min(best, time.perf_counter() - started)
+        results[name] = {
+            "available": True,
+            "msamples_per_s": len(samples) / best / 1e6,
+            "realtime_factor": seconds / best,
+        }
+    return results
+
+def record_throughput(backend, samples, seconds):
+    """Account processed samples so each backend's running throughput shows up in the metrics."""
+    metrics.increment(f"backend.{backend.name}.samples", samples)
+    metrics.record_time(f"backend.{backend.name}", seconds)
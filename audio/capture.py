@@ -0,0 +1,188 @@
+# capture.py
+import pyaudio
+import logging
+import threading
+import collections
+import time
+from utils import metrics
+from audio.device_manager import get_pyaudio, get_device_registry
+
+class CaptureSubscriber:
+    """Bounded buffer of raw int16 chunks fed by the CaptureEngine."""
+
+    def __init__(self, name, max_chunks=64):
+        self.name = name
+        self.chunks = collections.deque(maxlen=max_chunks)
+        self.condition = threading.Condition()
+        self.dropped_chunks = 0  # Chunks discarded because the consumer fell behind
+        self.closed = False
+
+    def push(self, data):
+        with self.condition:
+            if len(self.chunks) == self.chunks.maxlen:
+                self.dropped_chunks += 1
+                metrics.increment(f"capture.dropped_chunks.{self.name}")
+            self.chunks.append(data)
+            self.condition.notify()
+
+    def read(self, timeout=None):
+        """Return the oldest pending chunk, or None if nothing arrived within the timeout."""
+        with self.condition:
+            if not self.chunks and not self.closed:
+                self.condition.wait(timeout)
+            if not self.chunks:
+                return None
+            return self.chunks.popleft()
+
+    def clear(self):
+        with self.condition:
+            self.chunks.clear()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class CaptureEngine:
+    """Owns the single PyAudio input stream and fans its chunks out to subscribers."""
+
+    def __init__(self, chunk=1024):
+        self.chunk = chunk
+        self.device_index = None
+        self.sample_rate = None
+        self.stream = None
+        self.subscribers = ()  # Replaced, never mutated, so the callback can iterate without locking
+        self.lock = threading.RLock()
+        self.closed_at = None  # When the stream was last closed, to measure reopen gaps
+        self.last_callback_at = None  # Heartbeat used to spot streams that silently stalled
+
+    def start(self, device_index, sample_rate):
+        with self.lock:
+            if self.stream is not None:
+                if device_index == self.device_index and sample_rate == self.sample_rate:
+                    return  # Already capturing from this device
+                logging.info(f"Switching capture device from {self.device_index} to {device_index}.")
+                self._close_stream()
+            open_started = time.perf_counter()
+            self.stream = get_pyaudio().open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=sample_rate,
+                input=True,
+                input_device_index=device_index,
+                frames_per_buffer=self.chunk,
+                stream_callback=self._callback
+            )
+            opened = time.perf_counter()
+            metrics.increment("capture.stream_opens")
+            metrics.record_time("capture.stream_open", opened - open_started)
+            if self.closed_at is not None:
+                # Everything the device produced while the stream was closed is lost
+                gap = opened - self.closed_at
+                metrics.record_time("capture.reopen_gap", gap)
+                metrics.increment("capture.dropped_samples", int(gap * sample_rate))
+                self.closed_at = None
+            self.device_index = device_index
+            self.sample_rate = sample_rate
+            self.last_callback_at = opened
+            logging.info(f"Capture stream opened on device {device_index} at {sample_rate} Hz.")
+
+    def reopen(self):
+        """Close and reopen the stream on the same device, as the per-phrase mode does."""
+        with self.lock:
+            if self.stream is None:
+                return
+            device_index, sample_rate = self.device_index, self.sample_rate
+            self._close_stream()
+            self.start(device_index, sample_rate)
+
+    def suspend(self):
+        """Close the stream but keep subscribers attached, e.g. while switching devices."""
+        with self.lock:
+            if self.stream is not None:
+                self._close_stream()
+
+    def rescan_devices(self):
+        """Let PortAudio rescan the hardware and return the new device list.
+
+        PortAudio only enumerates devices when it initializes, which needs every
+        stream closed, so an open stream is closed around the rescan and reopened
+        on the same device, found again by fingerprint since indices can shift.
+        If that device is gone the stream stays closed for the device watcher.
+        """
+        registry = get_device_registry()
+        with self.lock:
+            if self.stream is None:
+                return registry.refresh(reinitialize=True)
+            current = registry.get(self.device_index)
+            sample_rate = self.sample_rate
+            self._close_stream()
+            devices = registry.refresh(reinitialize=True)
+            device = registry.find_by_fingerprint(current.fingerprint) if current else None
+            if device is None:
+                logging.warning("Capture device disappeared during the rescan.")
+            else:
+                self.start(device.index, sample_rate)
+            return devices
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        self.last_callback_at = time.perf_counter()
+        if status & pyaudio.paInputOverflow:
+            metrics.increment("capture.input_overflows")
+        for subscriber in self.subscribers:
+            subscriber.push(in_data)
+        return (None, pyaudio.paContinue)
+
+    def is_running(self):
+        with self.lock:
+            return self.stream is not None and self.stream.is_active()
+
+    def is_healthy(self, stall_timeout=2.0):
+        """True while the stream is open and still delivering audio."""
+        with self.lock:
+            if not self.is_running():
+                return False
+            return time.perf_counter() - self.last_callback_at < stall_timeout
+
+    def subscribe(self, name, max_chunks=64):
+        subscriber = CaptureSubscriber(name, max_chunks)
+        with self.lock:
+            self.subscribers = self.subscribers + (subscriber,)
+        logging.info(f"Capture subscriber '{name}' attached.")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not subscriber)
+            subscriber.close()
+            logging.info(f"Capture subscriber '{subscriber.name}' detached.")
+            if not self.subscribers:
+                self.stop()  # Nobody is listening, release the device
+
+    def _close_stream(self):
+        try:
+            if self.stream.is_active():
+                self.stream.stop_stream()
+            self.stream.close()
+        except Exception as e:
+            logging.error(f"Error closing capture stream: {e}")
+        finally:
+            self.stream = None
+            self.closed_at = time.perf_counter()
+
+    def stop(self):
+        with self.lock:
+            if self.stream is not None:
+                self._close_stream()
+                logging.info("Capture stream closed.")
+            self.closed_at = None  # A deliberate stop is not a gap between phrases
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_capture_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CaptureEngine()
+        return _engine
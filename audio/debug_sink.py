@@ -0,0 +1,82 @@
+# debug_sink.py
+import os
+import logging
+import queue
+import threading
+import time
+import wave
+from utils import metrics
+
+class DebugCaptureSink:
+    """Saves recognized utterances as WAV files on a background thread.
+
+    Recordings go to a directory capped at ``max_bytes``; the oldest files are
+    removed once the cap is exceeded. Disabled by default.
+    """
+
+    def __init__(self, directory="debug_recordings", max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = False
+        self.queue = queue.Queue(maxsize=16)
+        self.thread = None
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def configure(self, settings):
+        self.directory = settings.get("debug_capture_dir", "debug_recordings")
+        self.max_bytes = int(settings.get("debug_capture_max_mb", 50) * 1024 * 1024)
+        self.set_enabled(settings.get("debug_capture", False))
+
+    def set_enabled(self, enabled):
+        with self.lock:
+            self.enabled = bool(enabled)
+            if self.enabled and (self.thread is None or not self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name="debug-capture", daemon=True)
+                self.thread.start()
+        logging.info(f"Debug audio capture {'enabled' if self.enabled else 'disabled'}.")
+
+    def submit(self, samples, sample_rate):
+        """Queue int16 mono samples for writing; never blocks the caller."""
+        if not self.enabled:
+            return
+        try:
+            self.queue.put_nowait((samples, sample_rate))
+        except queue.Full:
+            metrics.increment("debug_capture.dropped")
+
+    def _run(self):
+        while True:
+            samples, sample_rate = self.queue.get()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self.count += 1
+                path = os.path.join(self.directory, f"utterance_{time.strftime('%Y%m%d_%H%M%S')}_{self.count:04d}.wav")
+                with wave.open(path, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(sample_rate)
+                    wf.writeframes(samples.tobytes())
+                metrics.increment("debug_capture.written")
+                self._rotate()
+            except Exception as e:
+                logging.error(f"Error writing debug recording: {e}")
+
+    def _rotate(self):
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".wav")]
+        paths.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in paths)
+        while paths and total > self.max_bytes:
+            oldest = paths.pop(0)
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+
+_sink = None
+_sink_lock = threading.Lock()
+
+def get_debug_sink():
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = DebugCaptureSink()
+        return _sink
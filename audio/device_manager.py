@@ -1,34 +1,182 @@
-import pyaudio
 import logging
+import threading
+import collections
+
+# fingerprint identifies a device across reboots (PortAudio indices shuffle), except between identical
+# twins, see device_fingerprint; label is its unique display name
+DeviceInfo = collections.namedtuple(
+    "DeviceInfo", ["index", "name", "rate", "channels", "host_api", "fingerprint", "label"]
+)
+
+_pyaudio = None
+_pyaudio_lock = threading.RLock()
+
+def get_pyaudio():
+    """Process-wide PortAudio session shared by device enumeration and every stream.
+
+    Callers must not terminate it; use reset_pyaudio when a rescan is needed.
+    """
+    global _pyaudio
+    with _pyaudio_lock:
+        if _pyaudio is None:
+            import pyaudio  # Deferred so listing modules does not load PortAudio
+            _pyaudio = pyaudio.PyAudio()
+        return _pyaudio
+
+def reset_pyaudio():
+    """Terminate and recreate the PortAudio session so newly attached devices show up.
+
+    Every stream opened from the old session must already be closed.
+    """
+    global _pyaudio
+    with _pyaudio_lock:
+        import pyaudio
+        if _pyaudio is not None:
+            _pyaudio.terminate()
+        _pyaudio = pyaudio.PyAudio()
+        return _pyaudio
+
+def device_fingerprint(host_api, name, channels, rate, occurrence=1):
+    """Stable identity built from host API, name, channel count and default rate.
+
+    Identical devices (two of the same USB headset) get an occurrence suffix in
+    enumeration order so each still has its own fingerprint. PortAudio exposes no
+    serial number or port path, and enumeration order can change between boots,
+    so such twins may swap fingerprints after a reboot or replug. Only devices
+    that differ in one of the four attributes keep their identity reliably.
+    """
+    fingerprint = f"{host_api}|{name}|{channels}|{rate}"
+    return fingerprint if occurrence == 1 else f"{fingerprint}#{occurrence}"
+
+class DeviceRegistry:
+    """Cached list of input devices with constant-time lookup by fingerprint, label, name and index."""
+
+    def __init__(self):
+        self.devices = []
+        self.by_fingerprint = {}
+        self.by_label = {}
+        self.by_name = {}
+        self.by_index = {}
+        self.loaded = False
+        self.warned_duplicates = set()  # Names already warned about, rescans happen often
+        self.lock = threading.RLock()
+
+    def refresh(self, reinitialize=False):
+        """Enumerate input devices again. With reinitialize, PortAudio itself rescans the hardware."""
+        with self.lock:
+            try:
+                p = reset_pyaudio() if reinitialize else get_pyaudio()
+                devices = []
+                host_apis = {}
+                occurrences = collections.Counter()
+                for i in range(p.get_device_count()):
+                    device_info = p.get_device_info_by_index(i)
+                    if device_info["maxInputChannels"] <= 0:
+                        continue
+                    host_api_index = device_info["hostApi"]
+                    if host_api_index not in host_apis:
+                        host_apis[host_api_index] = p.get_host_api_info_by_index(host_api_index)["name"]
+                    name = device_info["name"]
+                    rate = int(device_info["defaultSampleRate"])
+                    channels = device_info["maxInputChannels"]
+                    key = (host_apis[host_api_index], name, channels, rate)
+                    occurrences[key] += 1
+                    if occurrences[key] == 2 and name not in self.warned_duplicates:
+                        self.warned_duplicates.add(name)
+                        logging.warning(
+                            f"Several identical input devices named '{name}'; they are told apart by "
+                            f"enumeration order, which may change after a reboot."
+                        )
+                    devices.append(DeviceInfo(
+                        i, name, rate, channels, key[0], device_fingerprint(*key, occurrence=occurrences[key]), name
+                    ))
+                devices = self._label_duplicates(devices)
+            except Exception as e:
+                logging.error(f"Error listing input devices: {e}")
+                devices = []
+            self.devices = devices
+            self.by_index = {device.index: device for device in devices}
+            self.by_fingerprint = {device.fingerprint: device for device in devices}
+            self.by_label = {device.label: device for device in devices}
+            self.by_name = {}
+            for device in devices:
+                self.by_name.setdefault(device.name, device)  # First device wins for duplicate names
+            self.loaded = True
+            logging.info(f"Found {len(devices)} input devices.")
+            return list(devices)
+
+    @staticmethod
+    def _label_duplicates(devices):
+        """Give devices sharing a name distinct labels: add the host API, then an ordinal."""
+        name_counts = collections.Counter(device.name for device in devices)
+        api_counts = collections.Counter((device.name, device.host_api) for device in devices)
+        seen = collections.Counter()
+        labelled = []
+        for device in devices:
+            label = device.name
+            if name_counts[device.name] > 1:
+                label = f"{device.name} ({device.host_api})"
+                if api_counts[(device.name, device.host_api)] > 1:
+                    seen[(device.name, device.host_api)] += 1
+                    label = f"{device.name} ({device.host_api} #{seen[(device.name, device.host_api)]})"
+            labelled.append(device._replace(label=label))
+        return labelled
+
+    def input_devices(self):
+        with self.lock:
+            if not self.loaded:
+                self.refresh()
+            return list(self.devices)
+
+    def find_by_name(self, name):
+        with self.lock:
+            if not self.loaded:
+                self.refresh()
+            return self.by_name.get(name)
+
+    def find_by_fingerprint(self, fingerprint):
+        with self.lock:
+            if not self.loaded:
+                self.refresh()
+            return self.by_fingerprint.get(fingerprint)
+
+    def find_by_label(self, label):
+        with self.lock:
+            if not self.loaded:
+                self.refresh()
+            return self.by_label.get(label)
+
+    def resolve(self, fingerprint="", name=""):
+        """Find the saved device: by fingerprint first, then by display label or name for older settings."""
+        return (
+            (self.find_by_fingerprint(fingerprint) if fingerprint else None)
+            or (self.find_by_label(name) if name else None)
+            or (self.find_by_name(name) if name else None)
+        )
+
+    def get(self, index):
+        with self.lock:
+            if not self.loaded:
+                self.refresh()
+            return self.by_index.get(index)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_device_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DeviceRegistry()
+        return _registry
 
 def list_input_devices():
-    try:
-        p = pyaudio.PyAudio()
-        device_count = p.get_device_count()
-        devices = []
-        for i in range(device_count):
-            device_info = p.get_device_info_by_index(i)
-            if device_info["maxInputChannels"] > 0:
-                devices.append((i, device_info["name"]))
-        p.terminate()
-        logging.info(f"Found {len(devices)} input devices.")
-        return devices
-    except Exception as e:
-        logging.error(f"Error listing input devices: {e}")
-        return []
+    return [(device.index, device.label) for device in get_device_registry().input_devices()]
 
 def get_device_sample_rate(device_index):
-    try:
-        p = pyaudio.PyAudio()
-        device_info = p.get_device_info_by_index(device_index)
-        sample_rate = int(device_info["defaultSampleRate"])
-        p.terminate()
-        logging.info(f"Sample rate for device {device_index}: {sample_rate}")
-        return sample_rate
-    except Exception as e:
-        logging.error(f"Error retrieving sample rate for device {device_index}: {e}")
-        try:
-            p.terminate()
-        except:
-            pass
+    device = get_device_registry().get(device_index)
+    if device is None:
+        logging.error(f"Error retrieving sample rate for device {device_index}: unknown device")
         return 44100  # Fallback to a common sample rate
+    logging.info(f"Sample rate for device {device_index}: {device.rate}")
+    return device.rate
@@ -0,0 +1,132 @@
+# device_watcher.py
+import logging
+import threading
+import time
+from audio.device_manager import get_device_registry
+from utils import metrics
+
+class DeviceWatcher:
+    """Keeps the capture engine on a working input device without restarting the app.
+
+    Every ``interval`` seconds the watcher checks that the capture stream is still
+    delivering audio. When it is not (for example a USB microphone was unplugged),
+    the stream is closed, PortAudio rescans the hardware, the device list is diffed
+    and capture moves to the preferred device if present, else the first one.
+    The preferred device is the one saved in the settings, matched by fingerprint,
+    or by name for settings saved before fingerprints existed.
+
+    PortAudio can only see newly attached devices after a rescan, which needs the
+    stream closed, so while running on a fallback device the watcher only probes
+    for the preferred device's return every ``return_interval`` seconds (0 disables
+    the probe). Each probe costs a short audio gap, which is logged. With
+    ``is_quiet`` given, a due probe waits until it returns True so the gap does
+    not land in the middle of a command. The probe is only armed once the
+    preferred device is known by fingerprint (saved, or a saved name that resolved
+    at least once), and every probe that misses doubles the interval up to
+    ``max_return_interval``.
+    """
+
+    def __init__(self, engine, preferred_fingerprint, preferred_name="", interval=3.0, return_interval=30.0,
+                 is_quiet=None, max_return_interval=600.0):
+        self.engine = engine
+        self.preferred_fingerprint = preferred_fingerprint
+        self.preferred_name = preferred_name
+        self.interval = interval
+        self.return_interval = return_interval
+        self.max_return_interval = max(max_return_interval, return_interval)
+        self.probe_interval = return_interval  # Grows while the preferred device stays away
+        self.is_quiet = is_quiet
+        self.last_probe = time.perf_counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="device-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"Error in device watcher: {e}")
+
+    def is_preferred(self, device):
+        if device is None:
+            return False
+        if self.preferred_fingerprint:
+            return device.fingerprint == self.preferred_fingerprint
+        return self.preferred_name in (device.label, device.name)
+
+    def find_preferred(self):
+        registry = get_device_registry()
+        if self.preferred_fingerprint:
+            return registry.find_by_fingerprint(self.preferred_fingerprint)
+        device = registry.resolve(name=self.preferred_name) if self.preferred_name else None
+        if device is not None:
+            self.preferred_fingerprint = device.fingerprint  # Found by name once, follow it by fingerprint
+        return device
+
+    def check(self):
+        if not self.engine.subscribers:
+            return  # Nobody is capturing, nothing to keep alive
+        if not self.engine.is_healthy():
+            self.failover("capture stream stopped delivering audio")
+        elif (self.return_interval and self.preferred_fingerprint
+                and not self.is_preferred(get_device_registry().get(self.engine.device_index))
+                and time.perf_counter() - self.last_probe >= self.probe_interval):
+            if self.is_quiet is not None and not self.is_quiet():
+                return  # Probe on a later check instead of cutting into speech
+            self.failover(f"checking whether '{self.preferred_fingerprint}' is back")
+            if not self.is_preferred(get_device_registry().get(self.engine.device_index)):
+                self.probe_interval = min(self.probe_interval * 2, self.max_return_interval)
+                logging.info(f"Preferred device still missing, next check in {self.probe_interval:.0f} s.")
+
+    def failover(self, reason):
+        logging.warning(f"Device watcher: {reason}.")
+        registry = get_device_registry()
+        started = time.perf_counter()
+        self.last_probe = started
+        last_audio = self.engine.last_callback_at or started
+        with self.engine.lock:
+            previous_index = self.engine.device_index
+            previous = registry.get(previous_index)
+            sample_rate = self.engine.sample_rate
+            previous_labels = {device.label for device in registry.devices}
+            self.engine.suspend()
+            devices = registry.refresh(reinitialize=True)  # Safe now that no stream is open
+            current_labels = {device.label for device in devices}
+            for label in current_labels - previous_labels:
+                logging.info(f"Input device attached: {label}")
+            for label in previous_labels - current_labels:
+                logging.warning(f"Input device removed: {label}")
+            device = self.find_preferred() or (devices[0] if devices else None)
+            if device is None:
+                logging.error("No input devices available. Will retry.")
+                return
+            if self.is_preferred(device):
+                self.probe_interval = self.return_interval
+            try:
+                # Keep the current rate so downstream consumers are unaffected when possible
+                self.engine.start(device.index, sample_rate or device.rate)
+            except Exception as e:
+                logging.warning(f"Could not open '{device.label}' at {sample_rate} Hz ({e}), using {device.rate} Hz.")
+                self.engine.start(device.index, device.rate)
+        finished = time.perf_counter()
+        metrics.record_time("devices.audio_gap", finished - last_audio)
+        if previous is not None and device.fingerprint == previous.fingerprint:
+            metrics.increment("devices.reopens")  # Same device again, e.g. a probe that missed
+            logging.info(f"Capture reopened on '{device.label}', audio gap {(finished - last_audio) * 1000:.0f} ms.")
+            return
+        metrics.increment("devices.switches")
+        metrics.record_time("devices.switch_latency", finished - started)
+        logging.info(
+            f"Capture moved from device {previous_index} to '{device.label}' ({device.index}) "
+            f"in {(finished - started) * 1000:.0f} ms, audio gap {(finished - last_audio) * 1000:.0f} ms."
+        )
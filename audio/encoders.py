@@ -0,0 +1,155 @@
+# encoders.py
+import concurrent.futures
+import logging
+import time
+import numpy as np
+import speech_recognition as sr
+from utils import metrics
+
+class AudioEncoder:
+    """Turns an sr.AudioData utterance into the bytes uploaded to a recognizer."""
+
+    name = "base"
+
+    def encode(self, audio_data):
+        raise NotImplementedError
+
+    def content_type(self, sample_rate):
+        raise NotImplementedError
+
+class PCMEncoder(AudioEncoder):
+    name = "pcm"
+
+    def encode(self, audio_data):
+        return audio_data.get_raw_data()
+
+    def content_type(self, sample_rate):
+        return f"audio/l16; rate={sample_rate}; endianness=little-endian"
+
+class WAVEncoder(AudioEncoder):
+    name = "wav"
+
+    def encode(self, audio_data):
+        return audio_data.get_wav_data()
+
+    def content_type(self, sample_rate):
+        return "audio/wav"
+
+class FLACEncoder(AudioEncoder):
+    """Lossless, usually about half the size of PCM. Uses the flac binary bundled with speech_recognition."""
+
+    name = "flac"
+
+    def encode(self, audio_data):
+        return audio_data.get_flac_data()
+
+    def content_type(self, sample_rate):
+        return f"audio/x-flac; rate={sample_rate}"
+
+AUDIO_ENCODERS = {
+    PCMEncoder.name: PCMEncoder,
+    WAVEncoder.name: WAVEncoder,
+    FLACEncoder.name: FLACEncoder,
+}
+
+class EncodedAudioData(sr.AudioData):
+    """AudioData carrying a payload that was already encoded.
+
+    speech_recognition's own recognizers ask for FLAC or WAV data at the native
+    rate and width; when that matches the stored encoding they get the stored
+    bytes instead of encoding the utterance again.
+    """
+
+    def __init__(self, frame_data, sample_rate, sample_width, encoder, payload):
+        super().__init__(frame_data, sample_rate, sample_width)
+        self.encoder = encoder
+        self.payload = payload
+
+    def _stored(self, encoding, convert_rate, convert_width):
+        native = convert_rate in (None, self.sample_rate) and convert_width in (None, self.sample_width)
+        return self.payload if native and self.encoder.name == encoding else None
+
+    def get_flac_data(self, convert_rate=None, convert_width=None):
+        stored = self._stored("flac", convert_rate, convert_width)
+        return stored if stored is not None else super().get_flac_data(convert_rate, convert_width)
+
+    def get_wav_data(self, convert_rate=None, convert_width=None):
+        stored = self._stored("wav", convert_rate, convert_width)
+        return stored if stored is not None else super().get_wav_data(convert_rate, convert_width)
+
+def create_encoder(settings, backend):
+    """Encoder named by ``upload_encoding``; "auto" picks the one the backend prefers."""
+    name = settings.get("upload_encoding", "auto").lower()
+    if name == "auto":
+        name = backend.preferred_encoding
+    encoder_class = AUDIO_ENCODERS.get(name)
+    if encoder_class is None:
+        logging.warning(f"Unknown upload encoding '{name}'. Using '{backend.preferred_encoding}'.")
+        encoder_class = AUDIO_ENCODERS[backend.preferred_encoding]
+    logging.info(f"Uploading utterances as {encoder_class.name}.")
+    return encoder_class()
+
+def encode_utterance(encoder, samples, sample_rate):
+    """Encode int16 mono samples and record the time and size under encoder.<name>."""
+    frame_data = samples.tobytes()
+    started = time.perf_counter()
+    payload = encoder.encode(sr.AudioData(frame_data, sample_rate, 2))
+    metrics.record_time(f"encoder.{encoder.name}", time.perf_counter() - started)
+    metrics.increment(f"encoder.bytes.{encoder.name}", len(payload))
+    return EncodedAudioData(frame_data, sample_rate, 2, encoder, payload)
+
+class SpeculativeEncoder:
+    """Prepares an utterance on a background thread while the VAD is still confirming its end.
+
+    ``start`` is called with the VAD's tentative utterance; when the utterance
+    that is finally emitted is identical, ``take`` returns the future of that
+    work so the recognizer does not have to wait for preprocessing and encoding.
+    """
+
+    def __init__(self, prepare):
+        self.prepare = prepare  # prepare(samples, sample_rate) -> EncodedAudioData
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative-encoder")
+        self.pending = None  # (samples, sample_rate, future)
+
+    def start(self, samples, sample_rate):
+        if self.pending is not None:
+            self.pending[2].cancel()
+            metrics.increment("encoder.speculation_wasted")
+        self.pending = (samples, sample_rate, self.executor.submit(self.prepare, samples, sample_rate))
+
+    def take(self, samples, sample_rate):
+        pending, self.pending = self.pending, None
+        if pending is None:
+            return None
+        if pending[1] == sample_rate and np.array_equal(pending[0], samples):
+            metrics.increment("encoder.speculation_hits")
+            return pending[2]
+        pending[2].cancel()
+        metrics.increment("encoder.speculation_wasted")
+        return None
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def benchmark_encoders(encoders, utterances, sample_rate):
+    """Encode the same int16 utterances with every encoder and return size and latency per encoder."""
+    raw_bytes = sum(len(samples) * 2 for samples in utterances)
+    results = {}
+    for encoder in encoders:
+        latencies = []
+        encoded_bytes = 0
+        for samples in utterances:
+            audio_data = sr.AudioData(samples.tobytes(), sample_rate, 2)
+            started = time.perf_counter()
+            encoded_bytes += len(encoder.encode(audio_data))
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        results[encoder.name] = {
+            "utterances": len(latencies),
+            "bytes": encoded_bytes,
+            "ratio": encoded_bytes / raw_bytes if raw_bytes else 0.0,
+            "avg_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+            "max_ms": latencies[-1] if latencies else 0.0,
+        }
+    return results
@@ -0,0 +1,38 @@
+# features.py
+import functools
+import numpy as np
+
+def hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+def mel_to_hz(mel):
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+@functools.lru_cache(maxsize=16)
+def mel_filterbank(sample_rate, n_fft, n_mels):
+    """Triangular mel filters as an (n_mels, n_fft // 2 + 1) float32 matrix. Cached, do not modify."""
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = mel_to_hz(np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2))
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    filters = np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+    filters.setflags(write=False)
+    return filters
+
+@functools.lru_cache(maxsize=16)
+def hann_window(size):
+    window = np.hanning(size + 1)[:-1].astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+def log_mel_frames(samples, sample_rate, n_mels=24, frame_ms=25, hop_ms=10):
+    """Log mel energies of every frame, shape (frames, n_mels), computed with one batched rFFT."""
+    frame_size = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    if len(samples) < frame_size:
+        return np.zeros((0, n_mels), dtype=np.float32)
+    n_fft = 1 << (frame_size - 1).bit_length()
+    frames = np.lib.stride_tricks.sliding_window_view(samples.astype(np.float32), frame_size)[::hop]
+    power = np.square(np.abs(np.fft.rfft(frames * hann_window(frame_size), n=n_fft, axis=1)))
+    return np.log(power @ mel_filterbank(sample_rate, n_fft, n_mels).T + 1e-6).astype(np.float32)
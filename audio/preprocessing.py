@@ -0,0 +1,115 @@
+# preprocessing.py
+import logging
+import time
+import numpy as np
+from audio.array_backend import get_array_backend, record_throughput
+from utils import metrics
+
+class PreprocessingStage:
+    """One step of the preprocessing pipeline.
+
+    Stages receive a float32 buffer and the array backend, and return the
+    processed buffer. In-place backends hand back the same array.
+    """
+
+    name = "stage"
+
+    def process(self, buffer, backend):
+        raise NotImplementedError
+
+class SpectralSubtractionStage(PreprocessingStage):
+    """Removes a stationary noise spectrum measured during ambient calibration.
+
+    Each frame's magnitude spectrum is reduced by ``strength`` times the noise
+    magnitude, never below ``floor`` times the original, and resynthesized with
+    the original phase by overlap-add.
+    """
+
+    name = "spectral_subtraction"
+
+    def __init__(self, noise_profile, strength=1.0, floor=0.05):
+        self.noise_profile = noise_profile.astype(np.float32)
+        self.frame_size = (len(noise_profile) - 1) * 2
+        self.hop = self.frame_size // 2
+        self.strength = float(strength)
+        self.floor = float(floor)
+        # Square-root Hann for analysis and synthesis sums to one at 50% overlap
+        self.window = np.sqrt(np.hanning(self.frame_size + 1)[:-1]).astype(np.float32)
+        self.device_arrays = {}  # backend name -> (window, noise profile) on that backend
+
+    def process(self, buffer, backend):
+        count = len(buffer)
+        if count < self.frame_size:
+            return buffer
+        xp = backend.xp
+        if backend.name not in self.device_arrays:
+            self.device_arrays[backend.name] = (backend.to_device(self.window), backend.to_device(self.noise_profile))
+        window, noise_profile = self.device_arrays[backend.name]
+        frame_count = (count - self.frame_size) // self.hop + 1
+        # With 50% overlap every frame is two consecutive hops
+        halves = buffer[:(frame_count + 1) * self.hop].reshape(frame_count + 1, self.hop)
+        frames = xp.concatenate((halves[:-1], halves[1:]), axis=1)
+        spectrum = backend.subtract_noise(backend.rfft(frames * window), noise_profile, self.strength, self.floor)
+        output = backend.irfft(spectrum, self.frame_size)
+        output *= window
+
+        # Overlap-add: first halves land on their own hop, second halves on the next one
+        padded = xp.zeros_like(halves)
+        padded[:-1] += output[:, :self.hop]
+        padded[1:] += output[:, self.hop:]
+        # The first and last half-frames only received one window, keep the input there
+        processed = slice(self.hop, frame_count * self.hop)
+        buffer[processed] = padded.reshape(-1)[processed]
+        return buffer
+
+class NormalizeStage(PreprocessingStage):
+    name = "normalize"
+
+    def __init__(self, peak=32767.0):
+        self.peak = peak
+
+    def process(self, buffer, backend):
+        max_amp = backend.peak(buffer)
+        if max_amp == 0:
+            return buffer  # Silence, nothing to scale
+        return backend.multiply(buffer, self.peak / max_amp)
+
+class PreprocessingPipeline:
+    def __init__(self, stages, backend=None):
+        self.stages = stages
+        self.backend = backend or get_array_backend()
+
+    def process(self, samples):
+        """Run int16 samples through every stage and return a new int16 array."""
+        backend = self.backend
+        pipeline_started = time.perf_counter()
+        buffer = backend.to_device(samples)  # The only full-size copy besides the result
+        for stage in self.stages:
+            started = time.perf_counter()
+            buffer = stage.process(buffer, backend)
+            metrics.record_time(f"preprocessing.{stage.name}", time.perf_counter() - started)
+        buffer = backend.clip_int16(buffer)
+        result = backend.to_host(buffer.astype(backend.xp.int16))
+        record_throughput(backend, len(samples), time.perf_counter() - pipeline_started)
+        return result
+
+def estimate_noise_profile(samples, frame_size=512):
+    """Average magnitude spectrum of ambient noise, in the framing SpectralSubtractionStage uses."""
+    if len(samples) < frame_size:
+        return None
+    window = np.sqrt(np.hanning(frame_size + 1)[:-1]).astype(np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples.astype(np.float32), frame_size)[::frame_size // 2]
+    return np.abs(np.fft.rfft(frames * window, axis=1)).mean(axis=0)
+
+def build_pipeline(settings, noise_profile=None, backend=None):
+    # No gain stage: normalization rescales to full scale anyway, so sensitivity only sets the VAD threshold
+    stages = []
+    noise_reduction_level = settings.get("noise_reduction", 1.0)
+    if noise_reduction_level > 0:
+        if noise_profile is not None:
+            stages.append(SpectralSubtractionStage(noise_profile, strength=noise_reduction_level))
+        else:
+            logging.warning("No ambient noise profile available. Noise reduction disabled.")
+    stages.append(NormalizeStage())
+    logging.info(f"Preprocessing pipeline: {' -> '.join(stage.name for stage in stages)}")
+    return PreprocessingPipeline(stages, backend)
@@ -0,0 +1,109 @@
+# recognition_workers.py
+import collections
+import logging
+import threading
+import time
+from utils import metrics
+
+QUEUE_POLICIES = ("block", "drop_oldest")
+
+_DROPPED = object()  # Placeholder result for jobs discarded before a worker picked them up
+
+class RecognitionPool:
+    """Bounded pool of recognition workers with in-order result dispatch.
+
+    ``recognize(job)`` runs on one of the worker threads. Its return value is handed
+    to ``dispatch(result)`` on a single dispatcher thread in submission order, so
+    results never overtake each other even when a later job finishes first. ``None``
+    results are not dispatched.
+
+    When the queue is full, the "block" policy makes ``submit`` wait for a free slot
+    (backpressure on the capture loop) and "drop_oldest" discards the oldest queued job.
+    """
+
+    def __init__(self, recognize, dispatch, workers=2, queue_size=4, policy="block"):
+        if policy not in QUEUE_POLICIES:
+            logging.warning(f"Unknown recognition queue policy '{policy}'. Using 'block'.")
+            policy = "block"
+        self.recognize = recognize
+        self.dispatch = dispatch
+        self.queue_size = max(int(queue_size), 1)
+        self.policy = policy
+        self.jobs = collections.deque()
+        self.results = {}  # sequence number -> result, waiting for its turn to be dispatched
+        self.condition = threading.Condition()
+        self.next_sequence = 0
+        self.next_dispatch = 0
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"recognition-worker-{i}", daemon=True)
+            for i in range(max(int(workers), 1))
+        ]
+        self.threads.append(threading.Thread(target=self._dispatcher, name="recognition-dispatcher", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job):
+        with self.condition:
+            while self.running and len(self.jobs) >= self.queue_size:
+                if self.policy == "drop_oldest":
+                    sequence, _, _ = self.jobs.popleft()
+                    self.results[sequence] = _DROPPED
+                    metrics.increment("recognition.dropped_jobs")
+                    logging.warning("Recognition queue full, dropped the oldest utterance.")
+                    self.condition.notify_all()
+                else:
+                    metrics.increment("recognition.backpressure_waits")
+                    self.condition.wait()
+            if not self.running:
+                return False
+            self.jobs.append((self.next_sequence, job, time.perf_counter()))
+            self.next_sequence += 1
+            self.condition.notify_all()
+            return True
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while self.running and not self.jobs:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                sequence, job, queued_at = self.jobs.popleft()
+                self.condition.notify_all()  # A slot is free for blocked submitters
+            metrics.record_time("recognition.queue_wait", time.perf_counter() - queued_at)
+            started = time.perf_counter()
+            try:
+                result = self.recognize(job)
+            except Exception as e:
+                logging.error(f"Error in recognition worker: {e}")
+                result = None
+            metrics.record_time("recognition.worker", time.perf_counter() - started)
+            with self.condition:
+                self.results[sequence] = result
+                self.condition.notify_all()
+
+    def _dispatcher(self):
+        while True:
+            with self.condition:
+                while self.running and self.next_dispatch not in self.results:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                result = self.results.pop(self.next_dispatch)
+                self.next_dispatch += 1
+            if result is None or result is _DROPPED:
+                continue
+            try:
+                self.dispatch(result)
+            except Exception as e:
+                logging.error(f"Error dispatching recognition result: {e}")
+
+    def stop(self, timeout=2.0):
+        with self.condition:
+            self.running = False
+            self.jobs.clear()
+            self.condition.notify_all()
+        deadline = time.perf_counter() + timeout
+        for thread in self.threads:
+            thread.join(max(deadline - time.perf_counter(), 0))
@@ -0,0 +1,155 @@
+# recognizer_backends.py
+import collections
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import speech_recognition as sr
+from audio.encoders import EncodedAudioData
+from utils import metrics
+
+RecognitionResult = collections.namedtuple("RecognitionResult", ["text", "confidence"])
+
+class RecognizerBackend:
+    """Turns an sr.AudioData utterance into text.
+
+    Implementations raise sr.UnknownValueError when nothing was understood and
+    sr.RequestError when the service could not be reached. ``preferred_encoding``
+    names the upload encoding used when the settings leave it on "auto".
+    """
+
+    name = "base"
+    preferred_encoding = "wav"
+
+    def recognize(self, audio_data, language):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class GoogleBackend(RecognizerBackend):
+    """The free Google Web Speech API bundled with speech_recognition."""
+
+    name = "google"
+    preferred_encoding = "flac"  # The only format the API accepts
+
+    def __init__(self, settings):
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio_data, language):
+        response = self.recognizer.recognize_google(audio_data, language=language, show_all=True)
+        if not response or not response.get("alternative"):
+            raise sr.UnknownValueError()
+        best = response["alternative"][0]
+        return RecognitionResult(best["transcript"], best.get("confidence", 1.0))
+
+class LocalServerBackend(RecognizerBackend):
+    """Posts audio to a recognition server on this machine.
+
+    The server receives the encoded utterance as the request body, described by
+    its Content-Type header (WAV unless another upload encoding is configured),
+    and answers with JSON of the form {"text": "...", "confidence": 0.9}.
+    """
+
+    name = "local"
+
+    def __init__(self, settings):
+        self.url = settings.get("local_server_url", "http://127.0.0.1:8765/recognize")
+        self.timeout = settings.get("local_server_timeout", 5.0)
+
+    def recognize(self, audio_data, language):
+        query = urllib.parse.urlencode({"language": language, "rate": audio_data.sample_rate})
+        if isinstance(audio_data, EncodedAudioData):
+            payload = audio_data.payload
+            content_type = audio_data.encoder.content_type(audio_data.sample_rate)
+        else:
+            payload, content_type = audio_data.get_wav_data(), "audio/wav"
+        request = urllib.request.Request(f"{self.url}?{query}", data=payload, headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                result = json.loads(response.read().decode("utf-8"))
+        except (urllib.error.URLError, OSError) as e:
+            raise sr.RequestError(f"Local recognition server unavailable: {e}")
+        except ValueError as e:
+            raise sr.RequestError(f"Invalid response from local recognition server: {e}")
+        text = result.get("text", "").strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return RecognitionResult(text, result.get("confidence", 1.0))
+
+class FakeBackend(RecognizerBackend):
+    """Deterministic backend for benchmarks and for running without a recognition service.
+
+    Returns the entries of ``fake_transcripts`` in order, cycling, after an
+    optional fixed ``fake_latency_ms`` delay. An empty entry means "not understood".
+    """
+
+    name = "fake"
+    preferred_encoding = "pcm"  # Nothing is uploaded, so skip the encoding work
+
+    def __init__(self, settings):
+        self.transcripts = list(settings.get("fake_transcripts", []))
+        self.latency = settings.get("fake_latency_ms", 0) / 1000
+        self.calls = 0
+        self.lock = threading.Lock()  # Recognition workers share one backend
+
+    def recognize(self, audio_data, language):
+        if self.latency:
+            time.sleep(self.latency)
+        if not self.transcripts:
+            raise sr.UnknownValueError()
+        with self.lock:
+            text = self.transcripts[self.calls % len(self.transcripts)]
+            self.calls += 1
+        if not text:
+            raise sr.UnknownValueError()
+        return RecognitionResult(text, 1.0)
+
+RECOGNIZER_BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    LocalServerBackend.name: LocalServerBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+def create_recognizer_backend(settings):
+    name = settings.get("recognizer_backend", "google").lower()
+    backend_class = RECOGNIZER_BACKENDS.get(name)
+    if backend_class is None:
+        logging.warning(f"Unknown recognizer backend '{name}'. Falling back to Google.")
+        backend_class = GoogleBackend
+    logging.info(f"Using recognizer backend: {backend_class.name}")
+    return backend_class(settings)
+
+def timed_recognize(backend, audio_data, language):
+    """Run backend.recognize and record its latency under recognizer.<name>."""
+    started = time.perf_counter()
+    try:
+        return backend.recognize(audio_data, language)
+    finally:
+        metrics.record_time(f"recognizer.{backend.name}", time.perf_counter() - started)
+
+def benchmark_backends(backends, utterances, language="en-US"):
+    """Recognize the same utterances with every backend and return latency and error counts per backend."""
+    results = {}
+    for backend in backends:
+        latencies = []
+        errors = 0
+        for audio_data in utterances:
+            started = time.perf_counter()
+            try:
+                backend.recognize(audio_data, language)
+            except (sr.UnknownValueError, sr.RequestError):
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        results[backend.name] = {
+            "utterances": len(latencies),
+            "errors": errors,
+            "avg_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+            "max_ms": latencies[-1] if latencies else 0.0,
+        }
+    return results
@@ -0,0 +1,75 @@
+# resampler.py
+import functools
+import math
+import time
+import numpy as np
+from utils import metrics
+
+@functools.lru_cache(maxsize=16)
+def polyphase_filter(up, down, taps_per_phase=32):
+    """Kaiser-windowed sinc low-pass for a rational rate change, split into ``up`` phases.
+
+    Row ``p`` holds the taps applied to the input for outputs at upsampled phase
+    ``p``, newest input sample first. The result is cached per rate pair and
+    must not be modified.
+    """
+    length = taps_per_phase * up
+    cutoff = 0.45 / max(up, down)  # Just below the lower Nyquist frequency, in upsampled cycles/sample
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+    taps *= up / taps.sum()  # Unity gain after zero-stuffing by ``up``
+    phases = taps.reshape(taps_per_phase, up).T.astype(np.float32)
+    phases.setflags(write=False)
+    return phases
+
+class PolyphaseResampler:
+    """Streaming int16 resampler: downmixes interleaved channels, then changes rate by up/down.
+
+    Chunks of any size can be fed to ``process``; the filter history and the
+    output phase carry over between calls, so consecutive chunks resample exactly
+    like one long signal.
+    """
+
+    def __init__(self, input_rate, output_rate, channels=1, taps_per_phase=32):
+        self.input_rate = int(input_rate)
+        self.output_rate = int(output_rate)
+        self.channels = channels
+        divisor = math.gcd(self.input_rate, self.output_rate)
+        self.up = self.output_rate // divisor
+        self.down = self.input_rate // divisor
+        self.phases = polyphase_filter(self.up, self.down, taps_per_phase)
+        self.offsets = np.arange(taps_per_phase)
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros(len(self.offsets) - 1, dtype=np.float32)
+        self.next_time = len(self.history) * self.up  # Next output position, in upsampled samples from the history start
+
+    def downmix(self, samples):
+        if self.channels > 1:
+            frames = len(samples) // self.channels
+            return samples[:frames * self.channels].reshape(frames, self.channels).mean(axis=1, dtype=np.float32)
+        return samples.astype(np.float32)
+
+    def process(self, samples):
+        if isinstance(samples, (bytes, bytearray)):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        if self.up == self.down and self.channels == 1:
+            return samples  # Nothing to do at the same rate
+        started = time.perf_counter()
+        buffer = np.concatenate((self.history, self.downmix(samples)))
+        count = max(0, (len(buffer) * self.up - 1 - self.next_time) // self.down + 1)
+        times = self.next_time + self.down * np.arange(count)
+        newest = times // self.up
+        # Each output is the dot product of its phase's taps with the inputs preceding it
+        window = buffer[newest[:, None] - self.offsets]
+        output = np.einsum("ij,ij->i", self.phases[times % self.up], window)
+        shift = len(buffer) - len(self.history)
+        self.history = buffer[shift:].copy()
+        self.next_time += count * self.down - shift * self.up
+        metrics.record_time("capture.resample", time.perf_counter() - started)
+        return np.clip(np.rint(output), -32768, 32767).astype(np.int16)
+
+def resample(samples, input_rate, output_rate, channels=1):
+    """Resample one complete int16 signal."""
+    return PolyphaseResampler(input_rate, output_rate, channels).process(samples)
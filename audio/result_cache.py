@@ -0,0 +1,119 @@
+# result_cache.py
+import collections
+import logging
+import threading
+import time
+import numpy as np
+from audio.features import log_mel_frames
+from audio.recognizer_backends import RecognitionResult
+from utils import metrics
+
+_DYNAMIC_RANGE = np.log(10.0 ** 4)  # 40 dB below the loudest band
+
+def utterance_fingerprint(samples, sample_rate, n_mels=24, segments=16):
+    """Compact acoustic summary of an utterance: a quantized, normalized log-mel image.
+
+    The log-mel frames are averaged over ``segments`` equal slices of the utterance,
+    so slightly faster or slower repeats line up, everything more than 40 dB below
+    the loudest band is floored, and the per-band mean is removed so the
+    microphone gain does not matter. The result is an int8 vector of
+    ``n_mels * segments`` values whose dot products give cosine similarity.
+    """
+    frames = log_mel_frames(samples, sample_rate, n_mels)
+    if len(frames) < segments:
+        return None
+    np.maximum(frames, frames.max() - _DYNAMIC_RANGE, out=frames)  # Quiet bands are noise, not shape
+    summary = np.stack([chunk.mean(axis=0) for chunk in np.array_split(frames, segments)])
+    summary -= summary.mean(axis=0)
+    norm = np.linalg.norm(summary)
+    if norm == 0:
+        return None
+    return np.round(summary.ravel() / norm * 127).astype(np.int8)
+
+CacheEntry = collections.namedtuple("CacheEntry", ["fingerprint", "duration", "result"])
+
+class RecognitionResultCache:
+    """LRU cache of transcripts for utterances that sound the same.
+
+    A lookup compares the utterance fingerprint with every cached one and returns
+    the best entry whose cosine similarity reaches ``threshold`` and whose length is
+    within ``max_duration_ratio``. Only results with at least ``min_confidence``
+    are stored. The confidence of a hit is the stored confidence times the
+    similarity.
+    """
+
+    def __init__(self, max_entries=64, threshold=0.92, min_confidence=0.8, max_duration_ratio=1.3):
+        self.max_entries = max(int(max_entries), 1)
+        self.threshold = threshold
+        self.min_confidence = min_confidence
+        self.max_duration_ratio = max_duration_ratio
+        self.entries = collections.OrderedDict()  # key -> CacheEntry, least recently used first
+        self.next_key = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Recognition workers share one cache
+
+    def lookup(self, fingerprint, duration):
+        started = time.perf_counter()
+        with self.lock:
+            best_key, best_similarity = self._best_match(fingerprint, duration)
+            if best_key is not None and best_similarity >= self.threshold:
+                self.entries.move_to_end(best_key)
+                self.hits += 1
+                entry = self.entries[best_key]
+                result = RecognitionResult(entry.result.text, entry.result.confidence * best_similarity)
+            else:
+                self.misses += 1
+                result = None
+        metrics.record_time("cache.lookup", time.perf_counter() - started)
+        metrics.increment("cache.hits" if result else "cache.misses")
+        if result:
+            logging.info(f"Result cache hit: '{result.text}' (similarity {best_similarity:.2f})")
+        return result
+
+    def store(self, fingerprint, duration, result):
+        if fingerprint is None or result.confidence < self.min_confidence:
+            return
+        with self.lock:
+            key, similarity = self._best_match(fingerprint, duration)
+            if key is not None and similarity >= self.threshold and self.entries[key].result.text == result.text:
+                self.entries.move_to_end(key)  # Already known, just keep it fresh
+                return
+            self.entries[self.next_key] = CacheEntry(fingerprint, duration, result)
+            self.next_key += 1
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        metrics.increment("cache.stores")
+
+    def _best_match(self, fingerprint, duration):
+        if fingerprint is None or not self.entries:
+            return None, 0.0
+        keys = [
+            key for key, entry in self.entries.items()
+            if max(entry.duration, duration) <= self.max_duration_ratio * min(entry.duration, duration)
+        ]
+        if not keys:
+            return None, 0.0
+        cached = np.stack([self.entries[key].fingerprint for key in keys]).astype(np.int32)
+        similarities = (cached @ fingerprint.astype(np.int32)) / (127.0 * 127.0)
+        best = int(np.argmax(similarities))
+        return keys[best], float(similarities[best])
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+def create_result_cache(settings):
+    if not settings.get("result_cache", False):
+        return None
+    return RecognitionResultCache(
+        max_entries=settings.get("result_cache_size", 64),
+        threshold=settings.get("result_cache_threshold", 0.92),
+        min_confidence=settings.get("result_cache_min_confidence", 0.8)
+    )
@@ -0,0 +1,51 @@
+# ring_buffer.py
+import numpy as np
+
+class AudioRingBuffer:
+    """Preallocated ring buffer of int16 samples.
+
+    The storage is mirrored (every sample is written twice, ``capacity`` apart) so the
+    most recent samples can always be returned as one contiguous view without copying.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(int(capacity), 1)
+        self.buffer = np.zeros(self.capacity * 2, dtype=np.int16)
+        self.write_pos = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def write(self, samples):
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        count = len(samples)
+        if count >= self.capacity:
+            # Only the newest samples survive, so skip the ones that would be overwritten anyway
+            samples = samples[-self.capacity:]
+            count = self.capacity
+        end = self.write_pos + count
+        if end <= self.capacity:
+            self.buffer[self.write_pos:end] = samples
+            self.buffer[self.write_pos + self.capacity:end + self.capacity] = samples
+        else:
+            first = self.capacity - self.write_pos
+            self.buffer[self.write_pos:self.capacity] = samples[:first]
+            self.buffer[self.write_pos + self.capacity:] = samples[:first]
+            self.buffer[:count - first] = samples[first:]
+            self.buffer[self.capacity:self.capacity + count - first] = samples[first:]
+        self.write_pos = end % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def view(self, count=None):
+        """Return a read-only view of the newest ``count`` samples (all buffered samples by default)."""
+        count = self.size if count is None else min(int(count), self.size)
+        start = (self.write_pos - count) % self.capacity
+        view = self.buffer[start:start + count]
+        view.flags.writeable = False
+        return view
+
+    def clear(self):
+        self.write_pos = 0
+        self.size = 0
@@ -0,0 +1,85 @@
+# spectrum.py
+import logging
+import time
+import numpy as np
+from audio.features import hann_window, mel_filterbank
+from audio.array_backend import get_array_backend, record_throughput
+from utils import metrics
+
+class SpectrogramAnalyzer:
+    """Turns capture chunks into scrolling spectrogram columns with batched real FFTs.
+
+    Every ``hop`` samples a Hann-windowed ``fft_size`` frame becomes one column of
+    dB values, either per FFT bin or summed into ``mel_bands`` mel bands. All
+    frames completed by a chunk are transformed in one rFFT call on the given
+    array backend. Windows and mel filters are cached per size, and the CuPy
+    backend keeps its own FFT plan cache.
+
+    The analyzer measures its own cost as the fraction of real time spent
+    computing (``load``). When the load goes over ``cpu_budget``, it doubles the
+    hop, up to one column per frame. When the load falls well under the budget,
+    the hop goes back down.
+    """
+
+    def __init__(self, sample_rate, fft_size=512, hop=256, mel_bands=64, columns=200, cpu_budget=0.05, backend=None):
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.base_hop = hop
+        self.hop = hop
+        self.mel_bands = mel_bands
+        self.cpu_budget = cpu_budget
+        self.backend = backend or get_array_backend()
+        self.window = self.backend.to_device(hann_window(fft_size) / 32768.0)
+        # Full scale sine reads about 0 dB
+        self.reference = float(np.sum(hann_window(fft_size)) / 2) ** 2
+        self.filters = self.backend.to_device(mel_filterbank(sample_rate, fft_size, mel_bands).T) if mel_bands else None
+        rows = mel_bands or fft_size // 2 + 1
+        self.image = np.full((rows, columns), -120.0, dtype=np.float32)  # Oldest column first
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.load = 0.0
+        self.busy = 0.0  # Compute seconds and audio seconds since the last load update
+        self.audio = 0.0
+
+    def process(self, samples):
+        """Add int16 samples and return the number of new columns."""
+        started = time.perf_counter()
+        samples = np.concatenate((self.pending, samples)) if len(self.pending) else samples
+        frame_count = (len(samples) - self.fft_size) // self.hop + 1 if len(samples) >= self.fft_size else 0
+        self.pending = samples[frame_count * self.hop:].copy()
+        if frame_count:
+            self._add_columns(samples[:(frame_count - 1) * self.hop + self.fft_size], frame_count)
+        self._account(time.perf_counter() - started, len(samples) - len(self.pending))
+        return frame_count
+
+    def _add_columns(self, samples, frame_count):
+        backend = self.backend
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.fft_size)[::self.hop][:frame_count]
+        spectrum = backend.rfft(backend.to_device(frames) * self.window)
+        if self.filters is not None:
+            power = backend.xp.square(backend.xp.abs(spectrum)) @ self.filters
+            columns = 10.0 * backend.xp.log10(power / self.reference + 1e-12)
+        else:
+            columns = backend.power_db(spectrum, self.reference)
+        columns = backend.to_host(columns)
+        count = min(frame_count, self.image.shape[1])
+        self.image[:, :-count] = self.image[:, count:]
+        self.image[:, -count:] = columns[-count:].T
+
+    def _account(self, seconds, consumed):
+        metrics.record_time("visualizer.spectrum", seconds)
+        record_throughput(self.backend, consumed, seconds)
+        self.busy += seconds
+        self.audio += consumed / self.sample_rate
+        if self.audio < 1.0:
+            return
+        self.load = self.busy / self.audio
+        self.busy = self.audio = 0.0
+        if self.load > self.cpu_budget and self.hop < self.fft_size:
+            self.hop *= 2
+            logging.info(f"Spectrogram over its CPU budget ({self.load:.1%}), hop raised to {self.hop}.")
+        elif self.load < self.cpu_budget / 4 and self.hop > self.base_hop:
+            self.hop //= 2
+
+    def snapshot(self):
+        """Copy of the spectrogram in dB, shape (rows, columns), lowest frequency first."""
+        return self.image.copy()
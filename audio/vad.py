@@ -0,0 +1,127 @@
+# vad.py
+import math
+import logging
+import numpy as np
+from audio.ring_buffer import AudioRingBuffer
+from audio.array_backend import get_array_backend
+
+class EnergyVAD:
+    """Streaming energy-based voice activity detector.
+
+    Audio is split into fixed-size frames whose RMS energy is computed in one vectorized
+    pass per chunk on the given array backend. An utterance starts on the first voiced frame (prefixed with the
+    pre-roll) and ends after ``hangover_ms`` of silence or once ``max_length`` seconds
+    have been collected. An utterance shorter than ``min_length`` is held for one more
+    hangover and dropped unless speech resumes within it.
+
+    With ``tail_ms`` set, finished utterances keep only that much of the trailing
+    silence, and as soon as the tail is complete the would-be utterance is offered
+    through ``take_tentative`` so callers can start work on it while the hangover
+    decides whether the speaker is really done.
+    """
+
+    def __init__(self, sample_rate, threshold, frame_ms=30, hangover_ms=500, preroll_ms=300,
+                 min_length=1, max_length=10, tail_ms=None, backend=None):
+        self.sample_rate = sample_rate
+        self.backend = backend or get_array_backend()
+        self.threshold = threshold
+        self.frame_size = max(int(sample_rate * frame_ms / 1000), 1)
+        self.hangover_frames = max(math.ceil(hangover_ms / frame_ms), 1)
+        self.tail_frames = None if tail_ms is None else min(math.ceil(tail_ms / frame_ms), self.hangover_frames)
+        self.min_samples = int(sample_rate * min_length)
+        self.preroll = AudioRingBuffer(int(sample_rate * preroll_ms / 1000))
+        self.utterance = AudioRingBuffer(int(sample_rate * max_length))
+        self.pending = np.zeros(0, dtype=np.int16)  # Tail shorter than one frame
+        self.in_speech = False
+        self.silent_frames = 0
+        self.speech_end = 0  # Utterance length after the last voiced frame
+        self.tentative = None
+        self.quiet_frames = 0  # Silent frames since the last utterance ended or was dropped
+
+    def process(self, samples):
+        """Feed int16 samples and yield every utterance completed by them.
+
+        Yielded segments are views into the internal buffer and are only valid until the
+        consumer asks for the next one; copy them if they need to outlive that.
+        """
+        if len(self.pending):
+            samples = np.concatenate((self.pending, samples))
+        frame_count = len(samples) // self.frame_size
+        used = frame_count * self.frame_size
+        self.pending = samples[used:].copy()
+        if frame_count == 0:
+            return
+
+        frames = samples[:used].reshape(frame_count, self.frame_size)
+        energy = self.backend.frame_rms(frames)
+        voiced = energy > self.threshold
+
+        for frame, is_voiced in zip(frames, voiced):
+            if not self.in_speech:
+                if is_voiced:
+                    self.in_speech = True
+                    self.silent_frames = 0
+                    self.quiet_frames = 0
+                    # Also in front of a held fragment, so the new speech keeps its onset
+                    self.utterance.write(self.preroll.view())
+                    self.utterance.write(frame)
+                    self.speech_end = len(self.utterance)
+                    self.tentative = None
+                else:
+                    self.preroll.write(frame)
+                    if len(self.utterance):
+                        self.silent_frames += 1
+                        if self.silent_frames >= 2 * self.hangover_frames:
+                            # Nothing followed the fragment within another hangover, it was a click or cough
+                            logging.debug("Dropping utterance fragment shorter than minimum length.")
+                            self.utterance.clear()
+                    else:
+                        self.quiet_frames += 1
+                continue
+
+            self.utterance.write(frame)
+            if is_voiced:
+                self.silent_frames = 0
+                self.speech_end = len(self.utterance)
+                self.tentative = None  # Speech resumed, any earlier guess is wrong
+            else:
+                self.silent_frames += 1
+            full = len(self.utterance) >= self.utterance.capacity
+            if self.silent_frames >= self.hangover_frames or full:
+                self.in_speech = False
+                self.preroll.clear()
+                if len(self.utterance) < self.min_samples and not full:
+                    # Too short on its own, hold it for one more hangover in case speech resumes
+                    logging.debug("Utterance shorter than minimum length, waiting for more speech.")
+                    continue
+                self.tentative = None
+                yield self.utterance.view() if full else self._trimmed()
+                self.utterance.clear()
+            elif (self.tail_frames is not None and self.silent_frames == max(self.tail_frames, 1)
+                    and len(self.utterance) >= self.min_samples):
+                # Only ever on a silent frame, even with no tail, or every voiced frame would offer one
+                self.tentative = self._trimmed().copy()  # Copied, later frames may wrap the buffer
+
+    def _trimmed(self):
+        if self.tail_frames is None:
+            return self.utterance.view()
+        return self.utterance.view()[:self.speech_end + self.tail_frames * self.frame_size]
+
+    def quiet_seconds(self):
+        """How long the input has been silent with no utterance in progress or held."""
+        return self.quiet_frames * self.frame_size / self.sample_rate
+
+    def take_tentative(self):
+        """Return the utterance that ends here if the current silence lasts, once per pause, else None."""
+        tentative, self.tentative = self.tentative, None
+        return tentative
+
+    def reset(self):
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.preroll.clear()
+        self.utterance.clear()
+        self.in_speech = False
+        self.silent_frames = 0
+        self.speech_end = 0
+        self.tentative = None
+        self.quiet_frames = 0
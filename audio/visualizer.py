@@ -1,158 +1,329 @@
-import pyaudio
 import numpy as np
-import matplotlib
-matplotlib.use("TkAgg")  # Use TkAgg backend for compatibility with tkinter
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import logging
 import threading  # Add threading import
-import queue  # Add queue import
+import time
 import tkinter as tk
+from tkinter import ttk
+from audio.capture import get_capture_engine
+from audio.device_manager import get_device_registry
+from audio.spectrum import SpectrogramAnalyzer
+from audio.array_backend import get_array_backend
+from utils import metrics
 
-try:
-    import cupy as cp
-    CUPY_AVAILABLE = True
-except ImportError:
-    logging.warning("CuPy is not installed. GPU processing is unavailable.")
-    CUPY_AVAILABLE = False
-
-def list_input_devices():
-    try:
-        p = pyaudio.PyAudio()
-        devices = []
-        for i in range(p.get_device_count()):
-            device_info = p.get_device_info_by_index(i)
-            if device_info['maxInputChannels'] > 0:
-                devices.append((i, device_info['name']))
-        p.terminate()
-        return devices
-    except Exception as e:
-        logging.error(f"Error listing devices for visualizer: {e}")
-        return []
+def minmax_decimate(samples, width):
+    """Reduce samples to per-pixel (min, max) pairs so peaks survive any zoom level."""
+    width = max(min(int(width), len(samples)), 1)
+    per_pixel = len(samples) // width
+    columns = samples[:per_pixel * width].reshape(width, per_pixel)
+    return columns.min(axis=1), columns.max(axis=1)
+
+class LatestFrameSlot:
+    """Latest-wins handoff from the audio thread to the Tk loop.
+
+    The producer replaces a single (sequence, frame) tuple, which is one atomic
+    assignment, so neither side ever locks or waits and memory stays at one
+    frame. Frames overwritten before the consumer saw them are counted as dropped.
+    """
+
+    def __init__(self):
+        self.latest = None
+        self.published = 0  # Only written by the producer
+        self.last_taken = 0  # Only written by the consumer
+        self.dropped_frames = 0
+
+    def put(self, frame):
+        self.published += 1
+        self.latest = (self.published, frame)
+
+    def take(self):
+        """Return the newest frame if it has not been taken yet, else None."""
+        latest = self.latest
+        if latest is None or latest[0] == self.last_taken:
+            return None
+        sequence, frame = latest
+        dropped = sequence - self.last_taken - 1
+        if dropped:
+            self.dropped_frames += dropped
+            metrics.increment("visualizer.dropped_frames", dropped)
+        self.last_taken = sequence
+        return frame
+
+class CanvasRenderer:
+    """Draws the waveform and a level meter straight onto a tk.Canvas.
+
+    The waveform is a single polyline item whose coordinates are replaced every
+    frame, zig-zagging between each pixel column's minimum and maximum.
+    """
+
+    METER_WIDTH = 12
+    spectral = False  # Spectral renderers draw analyzer snapshots instead of raw chunks
+
+    def __init__(self, parent):
+        self.canvas = tk.Canvas(parent, background="black", highlightthickness=0, height=150)
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        self.line = self.canvas.create_line(0, 0, 0, 0, fill="#3fa7ff")
+        self.meter = self.canvas.create_rectangle(0, 0, 0, 0, fill="#3fbf5f", outline="")
+
+    def draw(self, samples):
+        width = self.canvas.winfo_width() - self.METER_WIDTH
+        height = self.canvas.winfo_height()
+        if width < 2 or height < 2 or len(samples) == 0:
+            return
+        mins, maxs = minmax_decimate(samples, width)
+        columns = len(mins)
+        scale = (height / 2) / 32768.0
+        coords = np.empty((columns, 4), dtype=np.float32)
+        coords[:, 0] = coords[:, 2] = np.arange(columns) * (width / columns)
+        coords[:, 1] = height / 2 - maxs * scale
+        coords[:, 3] = height / 2 - mins * scale
+        self.canvas.coords(self.line, *coords.ravel().tolist())
+
+        rms = np.sqrt(np.mean(np.square(samples, dtype=np.float32)))
+        level = max(0.0, 1.0 + 20 * np.log10(max(rms, 1.0) / 32768.0) / 60)  # 60 dB meter range
+        self.canvas.coords(self.meter, width + 2, height * (1 - level), width + self.METER_WIDTH, height)
+
+    def destroy(self):
+        self.canvas.destroy()
+
+class MatplotlibRenderer:
+    """The detailed plot with axes. Matplotlib is only imported when this view is chosen."""
+
+    spectral = False
+
+    def __init__(self, parent, chunk):
+        import matplotlib
+        matplotlib.use("TkAgg")  # Use TkAgg backend for compatibility with tkinter
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.fig = Figure()
+        self.ax = self.fig.add_subplot()
+        self.line, = self.ax.plot(np.zeros(chunk))
+        self.ax.set_ylim(-32768, 32767)
+        self.ax.set_xlim(0, chunk)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=parent)
+        self.canvas.draw()
+        self.canvas.get_tk_widget().grid(row=0, column=0, sticky='nsew')
+
+    def draw(self, samples):
+        if len(samples) != len(self.line.get_xdata()):
+            self.line.set_xdata(np.arange(len(samples)))
+            self.ax.set_xlim(0, len(samples))
+        self.line.set_ydata(samples)
+        self.canvas.draw_idle()
+
+    def destroy(self):
+        self.canvas.get_tk_widget().destroy()
+
+def _colormap():
+    """256-entry RGB lookup table running from black through blue and red to yellow."""
+    anchors = np.linspace(0, 255, 5)
+    colors = np.array([[0, 0, 0], [32, 0, 128], [200, 0, 90], [255, 140, 0], [255, 255, 160]])
+    levels = np.arange(256)
+    return np.stack([np.interp(levels, anchors, colors[:, i]) for i in range(3)], axis=1).astype(np.uint8)
+
+class SpectrumRenderer:
+    """The newest spectrogram column as a dB curve, with the analyzer's CPU load."""
+
+    spectral = True
+    FLOOR_DB = -100.0
+
+    def __init__(self, parent):
+        self.canvas = tk.Canvas(parent, background="black", highlightthickness=0, height=150)
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        self.line = self.canvas.create_line(0, 0, 0, 0, fill="#ffb030")
+        self.label = self.canvas.create_text(4, 4, anchor='nw', fill="gray", text="")
+
+    def draw(self, image, load):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width < 2 or height < 2:
+            return
+        column = image[:, -1]
+        x = np.linspace(0, width, len(column))
+        y = height * np.clip(column / self.FLOOR_DB, 0.0, 1.0)
+        self.canvas.coords(self.line, *np.column_stack((x, y)).ravel().tolist())
+        self.canvas.itemconfig(self.label, text=f"CPU {load:.1%}")
+
+    def destroy(self):
+        self.canvas.destroy()
+
+class SpectrogramRenderer(SpectrumRenderer):
+    """Scrolling spectrogram drawn as one Tk PhotoImage, low frequencies at the bottom."""
+
+    COLORMAP = _colormap()
+
+    def __init__(self, parent):
+        self.canvas = tk.Canvas(parent, background="black", highlightthickness=0, height=150)
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        self.photo = None  # Tk only keeps the image alive while Python holds a reference
+        self.image_item = self.canvas.create_image(0, 0, anchor='nw')
+        self.label = self.canvas.create_text(4, 4, anchor='nw', fill="gray", text="")
+
+    def draw(self, image, load):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width < 2 or height < 2:
+            return
+        levels = np.clip((image - self.FLOOR_DB) * (255 / -self.FLOOR_DB), 0, 255).astype(np.uint8)
+        # Nearest-neighbour scaling to the canvas size, flipped so row 0 is the top
+        rows = (len(levels) - 1 - np.arange(height) * len(levels) // height)
+        columns = np.arange(width) * levels.shape[1] // width
+        rgb = self.COLORMAP[levels[rows[:, None], columns[None, :]]]
+        header = f"P6 {width} {height} 255 ".encode("ascii")
+        self.photo = tk.PhotoImage(data=header + rgb.tobytes(), format="PPM")
+        self.canvas.itemconfig(self.image_item, image=self.photo)
+        self.canvas.itemconfig(self.label, text=f"CPU {load:.1%}")
+        self.canvas.tag_raise(self.label)
+
+VIEWS = ("Waveform", "Spectrum", "Spectrogram", "Detailed plot")
 
 class AudioVisualizer:
-    def __init__(self, parent, device_name="", processing_backend="CPU", chunk=1024):
+    def __init__(self, parent, device_name="", processing_backend="CPU", chunk=1024, max_fps=20, view="Waveform",
+                 mel_bands=64, cpu_budget=0.05):
         try:
+            self.parent = parent
             self.device_name = device_name
             self.chunk = chunk
-            self.processing_backend = processing_backend.upper()
-            self.use_gpu = False
-
-            if self.processing_backend == "GPU" and CUPY_AVAILABLE:
-                self.use_gpu = True
-                logging.info("GPU processing enabled.")
-
-            self.p = pyaudio.PyAudio()
-            devices = list_input_devices()
-            if self.device_name:
-                self.device_index = next((index for index, name in devices if name == self.device_name), None)
-                if self.device_index is None:
+            self.frame_interval = 1.0 / max(max_fps, 1)
+            self.mel_bands = mel_bands
+            self.cpu_budget = cpu_budget
+            self.array_backend = get_array_backend(processing_backend)  # Runs the spectrogram FFTs
+
+            self.engine = get_capture_engine()
+            self.subscriber = None
+            registry = get_device_registry()
+            devices = registry.input_devices()
+            device = registry.resolve(name=self.device_name) if self.device_name else None
+            if device is None:
+                if self.device_name:
                     logging.warning(f"Device '{self.device_name}' not found. Using default device.")
-                    self.device_index = devices[0][0] if devices else None
-            else:
-                self.device_index = devices[0][0] if devices else None
+                device = devices[0] if devices else None
 
-            if self.device_index is None:
+            if device is None:
                 logging.error("No valid input devices found.")
                 return
 
-            device_info = self.p.get_device_info_by_index(self.device_index)
-            self.rate = int(device_info["defaultSampleRate"])
-            self.channels = device_info["maxInputChannels"]
-
-            # Initialize Matplotlib figure and axis in the main thread
-            self.fig, self.ax = plt.subplots()
-            self.line, = self.ax.plot(np.zeros(self.chunk))
-            self.ax.set_ylim(-32768, 32767)
-            self.ax.set_xlim(0, self.chunk)
+            self.device_index = device.index
+            self.rate = device.rate
 
-            self.queue = queue.Queue()
+            self.frames = LatestFrameSlot()
+            self.spectra = LatestFrameSlot()  # Spectrogram snapshots for the spectral views
+            self.analyzer = None
             self.running = False
             self.audio_thread = None
+            self.after_id = None
 
             # Configure the parent frame to allow the canvas to expand
             parent.rowconfigure(0, weight=1)
             parent.columnconfigure(0, weight=1)
 
-            # Embed the plot into the Tkinter parent frame using grid
-            self.canvas = FigureCanvasTkAgg(self.fig, master=parent)
-            self.canvas.draw()
-            self.canvas.get_tk_widget().grid(row=0, column=0, sticky='nsew')  # Changed from pack to grid
-
-            # Initialize animation
-            self.ani = animation.FuncAnimation(
-                self.fig, self.update_plot, interval=50, blit=True, save_count=100
-            )
+            self.view_var = tk.StringVar(value=view if view in VIEWS else VIEWS[0])
+            self.view_combobox = ttk.Combobox(parent, textvariable=self.view_var, values=VIEWS, state="readonly", width=15)
+            self.view_combobox.grid(row=1, column=0, sticky='w')
+            self.view_combobox.bind("<<ComboboxSelected>>", self.on_view_selected)
+            self.renderer = None
+            self.create_renderer()
             logging.info("AudioVisualizer initialized and embedded in Tkinter frame.")
 
         except Exception as e:
             logging.error(f"Error initializing AudioVisualizer: {e}")
 
+    def create_renderer(self):
+        if self.renderer is not None:
+            self.renderer.destroy()
+        view = self.view_var.get()
+        if view == "Detailed plot":
+            self.renderer = MatplotlibRenderer(self.parent, self.chunk)
+        elif view == "Spectrogram":
+            self.renderer = SpectrogramRenderer(self.parent)
+        elif view == "Spectrum":
+            self.renderer = SpectrumRenderer(self.parent)
+        else:
+            self.renderer = CanvasRenderer(self.parent)
+        if self.renderer.spectral:
+            # Picked up by the audio thread on its next chunk
+            self.analyzer = SpectrogramAnalyzer(
+                self.engine.sample_rate or self.rate,
+                mel_bands=self.mel_bands,
+                cpu_budget=self.cpu_budget,
+                backend=self.array_backend
+            )
+        else:
+            self.analyzer = None
+
+    def on_view_selected(self, event):
+        try:
+            self.create_renderer()
+        except Exception as e:
+            logging.error(f"Error switching visualizer view: {e}")
+            self.view_var.set(VIEWS[0])
+            self.analyzer = None
+            self.renderer = CanvasRenderer(self.parent)
+
     def start(self):
         try:
+            if not self.engine.is_running():
+                # Recognition is not capturing yet, so open the shared stream on our device
+                self.engine.start(self.device_index, self.rate)
+            self.subscriber = self.engine.subscribe("visualizer", max_chunks=8)
             self.running = True
             # Start the audio processing in a separate thread
             self.audio_thread = threading.Thread(target=self.read_audio_data, daemon=True)
             self.audio_thread.start()
+            self.after_id = self.parent.after(0, self.update_plot)
         except Exception as e:
             logging.error(f"Error starting AudioVisualizer: {e}")
 
     def read_audio_data(self):
         try:
-            # Open audio stream
-            self.stream = self.p.open(
-                format=pyaudio.paInt16,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                input_device_index=self.device_index,
-                frames_per_buffer=self.chunk
-            )
             while self.running:
-                data = self.stream.read(self.chunk)
+                data = self.subscriber.read(timeout=0.5)
+                if data is None:
+                    if self.subscriber.closed:
+                        break
+                    continue
                 audio_data = np.frombuffer(data, dtype=np.int16)
-                
-                # Convert to mono if multiple channels are present
-                if self.channels > 1:
-                    audio_data = audio_data.reshape(-1, self.channels)
-                    audio_data = audio_data.mean(axis=1).astype(np.int16)
-                    logging.debug(f"Converted to mono. Shape: {audio_data.shape}")
-                else:
-                    logging.debug(f"Mono audio data received. Shape: {audio_data.shape}")
-                
-                self.queue.put(audio_data)
+                logging.debug(f"Audio data received. Shape: {audio_data.shape}")
+                analyzer = self.analyzer
+                if analyzer is None:
+                    self.frames.put(audio_data)
+                elif analyzer.process(audio_data):
+                    self.spectra.put((analyzer.snapshot(), analyzer.load))
         except Exception as e:
             logging.error(f"Error in AudioVisualizer read_audio_data: {e}")
             self.running = False  # Stop if there's an error
-        finally:
-            self.stop()
 
-    def update_plot(self, frame):
+    def update_plot(self):
+        """Draw the newest frame on the Tk thread, then schedule the next one within the frame rate cap."""
+        started = time.perf_counter()
         try:
-            if not self.queue.empty():
-                audio_data = self.queue.get_nowait()
-                self.line.set_ydata(audio_data)
-            return self.line,
+            renderer = self.renderer
+            frame = (self.spectra if renderer.spectral else self.frames).take()
+            if frame is not None:
+                if renderer.spectral:
+                    renderer.draw(*frame)
+                else:
+                    renderer.draw(frame)
+                metrics.record_time("visualizer.render", time.perf_counter() - started)
         except Exception as e:
             logging.error(f"Error updating plot: {e}")
+        if self.running:
+            elapsed = time.perf_counter() - started
+            self.after_id = self.parent.after(max(int((self.frame_interval - elapsed) * 1000), 1), self.update_plot)
 
     def stop(self):
         try:
             self.running = False
+            if self.after_id is not None:
+                self.parent.after_cancel(self.after_id)
+                self.after_id = None
             if self.audio_thread and self.audio_thread.is_alive():
                 self.audio_thread.join()
-            self.p.terminate()
-            if hasattr(self, 'stream') and self.stream.is_active():
-                self.stream.stop_stream()
-                self.stream.close()
-            self.p.terminate()
-            plt.close(self.fig)
-            logging.info("Visualizer stopped.")
-        except Exception as e:
-            logging.error(f"Error stopping AudioVisualizer: {e}")
-
-            plt.close(self.fig)
-            logging.info("Visualizer stopped.")
+            if self.subscriber is not None:
+                self.engine.unsubscribe(self.subscriber)
+                self.subscriber = None
+            logging.info(f"Visualizer stopped. {self.frames.dropped_frames} frames were not displayed.")
+            metrics.log_summary("visualizer.")
         except Exception as e:
             logging.error(f"Error stopping AudioVisualizer: {e}")
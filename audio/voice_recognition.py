@@ -2,20 +2,28 @@
 import speech_recognition as sr
 import logging
 import threading
+import time
 from config.settings import load_settings
-from utils.keyboard_controller import execute_shortcut
-from audio.device_manager import list_input_devices, get_device_sample_rate
-import collections
+from utils.keyboard_controller import get_shortcut_executor, ShortcutParseError
+from utils.macros import MacroCompiler
+from utils.command_matcher import CommandMatcher
+from utils.fuzzy_matcher import FuzzyIndex
+from audio.device_manager import get_device_registry
+from audio.device_watcher import DeviceWatcher
+from audio.capture import get_capture_engine
+from audio.vad import EnergyVAD
+from audio.resampler import PolyphaseResampler, resample
+from audio.recognizer_backends import create_recognizer_backend, timed_recognize
+from audio.encoders import create_encoder, encode_utterance, SpeculativeEncoder
+from audio.result_cache import create_result_cache, utterance_fingerprint
+from audio.recognition_workers import RecognitionPool
+from audio.debug_sink import get_debug_sink
+from audio.preprocessing import build_pipeline, estimate_noise_profile
+from audio.array_backend import get_array_backend
+from utils import metrics
 import numpy as np  # Add import for NumPy
 import base64  # Add import for base64
 
-try:
-    import cupy as cp
-    CUPY_AVAILABLE = True
-except ImportError:
-    logging.warning("CuPy is not installed. GPU processing is unavailable for voice recognition.")
-    CUPY_AVAILABLE = False
-
 recognition_running = False
 
 def stop_voice_recognition():
@@ -23,22 +31,142 @@ def stop_voice_recognition():
     logging.info("Stopping voice recognition.")
     recognition_running = False
 
-def apply_noise_reduction(audio_data, noise_reduction_level):
-    # Simple noise reduction algorithm (placeholder)
-    # This can be replaced with a more sophisticated algorithm if needed
-    return audio_data * (1 - noise_reduction_level)
+class CaptureStream:
+    """File-like reader over a capture subscriber, as expected by speech_recognition."""
+
+    def __init__(self, subscriber, engine):
+        self.subscriber = subscriber
+        self.engine = engine
+        self.pending = b""
+        self.recording = None  # Chunks handed out while a recording is active
+
+    def start_recording(self):
+        self.recording = []
+
+    def stop_recording(self):
+        recorded, self.recording = b"".join(self.recording or []), None
+        return recorded
+
+    def read(self, size):
+        wanted = size * 2  # int16 mono, two bytes per frame
+        while len(self.pending) < wanted:
+            data = self.subscriber.read(timeout=1.0)
+            if data is None:
+                if self.subscriber.closed or not self.engine.is_running():
+                    raise IOError("Capture stream stopped.")
+                continue
+            self.pending += data
+        data, self.pending = self.pending[:wanted], self.pending[wanted:]
+        if self.recording is not None:
+            self.recording.append(data)
+        return data
+
+class CaptureSource(sr.AudioSource):
+    """speech_recognition source backed by the shared capture engine instead of its own stream."""
+
+    def __init__(self, subscriber, engine):
+        self.SAMPLE_RATE = engine.sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = engine.chunk
+        self.stream = CaptureStream(subscriber, engine)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+def prepare_utterance(pipeline, encoder, audio_array, sample_rate):
+    """Preprocess one utterance and encode it for upload."""
+    # Gain, noise reduction and normalization in one float32 buffer
+    return encode_utterance(encoder, pipeline.process(audio_array), sample_rate)
+
+def recognize_utterance(backend, pipeline, encoder, cache, audio_array, sample_rate, prepared, settings):
+    """Recognize one utterance and return the text, or None. Runs on a recognition worker.
+
+    ``prepared`` is the future of a speculative prepare_utterance run on exactly
+    this audio, or None when it still has to be done here. With a result ``cache``,
+    confident repeats of earlier utterances are answered without encoding or the backend.
+    """
+    logging.info(f"Utterance captured: {len(audio_array) / sample_rate:.2f}s")
+    if prepared is not None:
+        audio_data = prepared.result()
+        processed = np.frombuffer(audio_data.frame_data, dtype=np.int16)
+    else:
+        audio_data = None  # Encoded below, unless the cache answers first
+        # Gain, noise reduction and normalization in one float32 buffer
+        processed = pipeline.process(audio_array)
+
+    language = settings.get("language", "en-US")
+    logging.info(f"Using language: {language}")
+
+    # Hand the audio to the debug recorder, which writes it off this thread when enabled
+    get_debug_sink().submit(processed, sample_rate)
 
-def normalize_audio(audio_data):
-    max_amp = np.max(np.abs(audio_data))
-    if max_amp == 0:
-        max_amp = 1  # Prevent division by zero
-    return (audio_data / max_amp * 32767).astype(np.int16)
+    fingerprint = None
+    duration = len(processed) / sample_rate
+    if cache is not None:
+        fingerprint = utterance_fingerprint(processed, sample_rate)
+        cached = cache.lookup(fingerprint, duration)
+        if cached is not None:
+            logging.info(f"Recognized command: {cached.text} (cached, confidence {cached.confidence:.2f})")
+            return cached.text
 
-def voice_recognition(settings):
+    if audio_data is None:
+        audio_data = encode_utterance(encoder, processed, sample_rate)
+    try:
+        result = timed_recognize(backend, audio_data, language)
+    except sr.UnknownValueError:
+        logging.warning("Could not understand audio.")
+        return None
+    except sr.RequestError as e:
+        logging.error(f"Recognition service error: {e}")  # Drop this utterance but keep listening
+        return None
+    if cache is not None:
+        cache.store(fingerprint, duration, result)
+    logging.info(f"Recognized command: {result.text} (confidence {result.confidence:.2f})")
+    return result.text
+
+def dispatch_command(command, matcher, fuzzy_index, compiler, settings):
+    """Execute the shortcut matching a recognized command. Called in utterance order."""
+    if settings.get("enable_shortcuts", True):
+        match = matcher.match(command)
+        if not match and fuzzy_index is not None:
+            fuzzy_match = fuzzy_index.match(command, settings.get("fuzzy_threshold", 0.75))
+            if fuzzy_match:
+                match = fuzzy_match[:2]
+                logging.info(f"Fuzzy matched '{command}' to '{match[0]}'.")
+        if match:
+            cmd, shortcut = match
+            logging.info(f"Executing shortcut for command '{cmd}': {shortcut['execute']}")
+            try:
+                program = compiler.compile(
+                    shortcut["execute"],
+                    key_delay=shortcut.get("keyDelay", 50) / 1000,
+                    post_delay=shortcut.get("postDelay", 100) / 1000,
+                    command=cmd
+                )
+            except ShortcutParseError as e:
+                logging.error(f"Error executing shortcut '{shortcut['execute']}': {e}")
+                return
+            get_shortcut_executor().submit(program, shortcut["execute"])
+        else:
+            logging.warning(f"No matching shortcut found for recognized command: {command}")
+    else:
+        logging.info("Shortcuts are disabled.")
+
+def voice_recognition(settings, on_ready=None):
+    """Capture, segment and recognize speech until stop_voice_recognition is called.
+
+    ``on_ready`` is called once on this thread when listening starts.
+    """
     global recognition_running
     recognition_running = True
+    started = time.perf_counter()
     recognizer = sr.Recognizer()
-    devices = list_input_devices()
+    registry = get_device_registry()
+    devices = registry.input_devices()
+    metrics.record_time("startup.device_registry", time.perf_counter() - started)
     if not devices:
         logging.error("No input devices found.")
         recognition_running = False
@@ -47,104 +175,160 @@ def voice_recognition(settings):
     min_audio_length = settings.get("min_audio_length", 1)
     max_audio_length = settings.get("max_audio_length", 10)
     sensitivity = settings.get("sensitivity", 1.0)  # Sensitivity ranges from 0 to 1
-    noise_reduction_level = settings.get("noise_reduction", 1.0)  # Noise reduction level ranges from 0 to 1
-    processing_backend = settings.get("processing_backend", "CPU").upper()
-    use_gpu = False
-
-    if processing_backend == "GPU":
-        if CUPY_AVAILABLE:
-            use_gpu = True
-            logging.info("GPU processing enabled for voice recognition.")
-        else:
-            logging.warning("CuPy is not installed or GPU is unavailable. Falling back to CPU processing.")
-            processing_backend = "CPU"
+    persistent_stream = settings.get("persistent_stream", True)  # Keep the device open between phrases
+    array_backend = get_array_backend(settings.get("processing_backend", "CPU"))  # Runs preprocessing and the VAD
+    engine = get_capture_engine()
+    subscriber = None
+    backend = None
+    pool = None
+    watcher = None
+    speculation = None
 
     try:
         device_name = settings.get("last_device_name", "")
-        device_index = next((index for index, name in devices if name == device_name), None)
-        if device_index is None:
-            if devices:
-                device_index = devices[0][0]
-                logging.warning(f"Device '{device_name}' not found. Using default device: '{devices[0][1]}'")
-            else:
-                logging.error("No input devices available.")
-                recognition_running = False
-                return
-        sample_rate = get_device_sample_rate(device_index)
-        mic = sr.Microphone(device_index=device_index, sample_rate=sample_rate)
+        preferred_fingerprint = settings.get("last_device_id", "")
+        device = registry.resolve(preferred_fingerprint, device_name)
+        if device is not None:
+            preferred_fingerprint = device.fingerprint
+        elif preferred_fingerprint or device_name:
+            device = devices[0]
+            logging.warning(f"Device '{device_name}' not found. Using default device: '{device.name}'")
+        else:
+            device = devices[0]  # Nothing saved yet, the default device is the preferred one
+            preferred_fingerprint = device.fingerprint
+        sample_rate = device.rate
+        target_rate = settings.get("target_sample_rate", 16000)  # 0 keeps the device rate
+        recognition_rate = target_rate or sample_rate
+        engine.start(device.index, sample_rate)
+        subscriber = engine.subscribe("recognizer")
+        mic = CaptureSource(subscriber, engine)
+        calibration_started = time.perf_counter()
         with mic as source:
             logging.info("Adjusting for ambient noise...")
+            source.stream.start_recording()  # Keep the calibration audio as the noise profile
             recognizer.adjust_for_ambient_noise(source, duration=1.0)  # Use a fixed duration for ambient noise adjustment
+            ambient = np.frombuffer(source.stream.stop_recording(), dtype=np.int16)
             logging.info("Ambient noise adjustment complete.")
+        metrics.record_time("startup.calibration", time.perf_counter() - calibration_started)
+        # Everything after capture runs at the recognition rate, including the noise profile
+        pipeline = build_pipeline(
+            settings, estimate_noise_profile(resample(ambient, sample_rate, recognition_rate)), array_backend
+        )
+        resampler = PolyphaseResampler(sample_rate, recognition_rate)
+        logging.info(f"Capturing at {sample_rate} Hz, recognizing at {recognition_rate} Hz.")
         
-        logging.info("Listening started.")
-        audio_buffer = collections.deque(maxlen=int(sample_rate * max_audio_length))
+        def create_vad(rate):
+            return EnergyVAD(
+                rate,
+                threshold=recognizer.energy_threshold * (2.0 - sensitivity),  # Higher sensitivity lowers the threshold
+                frame_ms=settings.get("vad_frame_ms", 30),
+                hangover_ms=settings.get("vad_hangover_ms", 500),
+                preroll_ms=settings.get("vad_preroll_ms", 300),
+                min_length=min_audio_length,
+                max_length=max_audio_length,
+                tail_ms=settings.get("vad_tail_ms", 150),
+                backend=array_backend
+            )
+
+        vad = create_vad(recognition_rate)
+        watcher = DeviceWatcher(
+            engine,
+            preferred_fingerprint,  # The saved device, so a fallback at startup still moves back when it returns
+            device_name,
+            interval=settings.get("device_watch_interval", 3.0),
+            return_interval=settings.get("device_return_interval", 30.0),
+            is_quiet=lambda: vad.quiet_seconds() >= settings.get("device_probe_quiet", 1.0)
+        )
+        watcher.start()
+        backend = create_recognizer_backend(settings)
+        encoder = create_encoder(settings, backend)
+        cache = create_result_cache(settings)
+        speculation = SpeculativeEncoder(lambda samples, rate: prepare_utterance(pipeline, encoder, samples, rate))
+        matcher = CommandMatcher(settings.get("shortcuts", {}))  # Rebuilt whenever settings are saved
+        get_shortcut_executor().configure(settings)
+        compiler = MacroCompiler(settings.get("shortcuts", {}))
+        for cmd, shortcut in settings.get("shortcuts", {}).items():
+            try:
+                # Compile every shortcut up front so firing one only replays its program
+                compiler.compile(
+                    shortcut["execute"],
+                    key_delay=shortcut.get("keyDelay", 50) / 1000,
+                    post_delay=shortcut.get("postDelay", 100) / 1000,
+                    command=cmd
+                )
+            except ShortcutParseError as e:
+                logging.warning(f"Shortcut for command '{cmd}' is invalid: {e}")
+        fuzzy_index = FuzzyIndex(settings.get("shortcuts", {})) if settings.get("fuzzy_matching", False) else None
+        get_debug_sink().configure(settings)
+        pool = RecognitionPool(
+            recognize=lambda job: recognize_utterance(backend, pipeline, encoder, cache, *job, settings),
+            dispatch=lambda command: dispatch_command(command, matcher, fuzzy_index, compiler, settings),
+            workers=settings.get("recognition_workers", 2),
+            queue_size=settings.get("recognition_queue_size", 4),
+            policy=settings.get("recognition_queue_policy", "block")
+        )
+        metrics.reset("capture.")
+        metrics.reset("recognition.")
+        metrics.reset("preprocessing.")
+        metrics.reset("encoder.")
+        metrics.reset("cache.")
+        metrics.reset("backend.")
+        metrics.record_time("startup.ready_to_listen", time.perf_counter() - started)
+        logging.info(f"Listening started ({'persistent' if persistent_stream else 'per-phrase'} stream).")
+        if on_ready is not None:
+            on_ready()
 
         while recognition_running:
             try:
-                with mic as source:
-                    logging.info("Listening for audio...")
-                    audio_chunk = recognizer.listen(source, timeout=min_audio_length + 5, phrase_time_limit=None)
-                    audio_buffer.extend(audio_chunk.get_raw_data())
-                    
-                    if len(audio_buffer) >= sample_rate * min_audio_length:
-                        audio_data = sr.AudioData(bytes(audio_buffer), sample_rate, 2)
-                        
-                        # Convert audio data to NumPy array for processing
-                        audio_array = np.frombuffer(audio_data.get_raw_data(), dtype=np.int16)
-                        
-                        # Apply volume adjustment
-                        audio_array = audio_array * sensitivity
-                        logging.info(f"Volume adjusted with sensitivity: {sensitivity}")
-                        
-                        # Apply noise reduction
-                        audio_array = apply_noise_reduction(audio_array, noise_reduction_level)
-                        logging.info(f"Noise reduction applied with level: {noise_reduction_level}")
-                        
-                        # Normalize audio
-                        audio_array = normalize_audio(audio_array)
-                        logging.info("Audio normalized.")
-                        
-                        # Convert back to AudioData
-                        audio_data = sr.AudioData(audio_array.tobytes(), sample_rate, 2)
-                        
-                        language = settings.get("language", "en-US")
-                        logging.info(f"Using language: {language}")
-                        
-                        # Save audio to file for debugging
-                        with open("debug_audio.wav", "wb") as f:
-                            f.write(audio_data.get_wav_data())
-                        
-                        command = recognizer.recognize_google(audio_data, language=language)
-                        logging.info(f"Recognized command: {command}")
-                        
-                        if settings.get("enable_shortcuts", True):
-                            for cmd, shortcut in settings.get("shortcuts", {}).items():
-                                if shortcut["enable"] and cmd.lower() in command.lower():
-                                    if shortcut["requireWord"] and not command.lower().startswith(shortcut["requireWord"].lower()):
-                                        logging.warning(f"Command does not start with the required keyword: {shortcut['requireWord']}")
-                                        continue
-                                    logging.info(f"Executing shortcut for command '{cmd}': {shortcut['execute']}")
-                                    execute_shortcut(shortcut["execute"])
-                                    break
-                            else:
-                                logging.warning(f"No matching shortcut found for recognized command: {command}")
-                        else:
-                            logging.info("Shortcuts are disabled.")
-                        audio_buffer.clear()
-            except sr.WaitTimeoutError:
-                logging.warning("Listening timed out while waiting for phrase to start.")
-            except sr.UnknownValueError:
-                logging.warning("Could not understand audio.")
-                audio_buffer.clear()
-            except sr.RequestError as e:
-                logging.error(f"Recognition service error: {e}")
-                break
+                data = subscriber.read(timeout=0.5)
+                if data is None:
+                    if subscriber.closed:
+                        logging.error("Capture stream stopped unexpectedly.")
+                        break
+                    continue  # The device watcher restores a stalled stream
+                if engine.sample_rate != sample_rate:
+                    # The watcher had to move to a device that does not support the old rate
+                    logging.warning(f"Capture rate changed from {sample_rate} to {engine.sample_rate} Hz.")
+                    sample_rate = engine.sample_rate
+                    resampler = PolyphaseResampler(sample_rate, target_rate or sample_rate)
+                    if not target_rate:
+                        recognition_rate = sample_rate
+                        vad = create_vad(recognition_rate)
+                for audio_array in vad.process(resampler.process(data)):
+                    # The VAD reuses its buffer for the next utterance
+                    prepared = speculation.take(audio_array, recognition_rate)
+                    pool.submit((audio_array.copy(), recognition_rate, prepared))
+                    if not persistent_stream:
+                        # Legacy behaviour: reopen the device for every phrase
+                        engine.reopen()
+                        subscriber.clear()
+                tentative = vad.take_tentative()
+                if tentative is not None:
+                    # Preprocess and encode now, the hangover usually confirms this end
+                    speculation.start(tentative, recognition_rate)
             except Exception as e:
                 logging.error(f"Unexpected error in listen_loop: {e}")
                 break
     except Exception as e:
         logging.error(f"Error initializing voice recognition: {e}")
     finally:
+        if watcher is not None:
+            watcher.stop()
+        if subscriber is not None:
+            engine.unsubscribe(subscriber)
+        if pool is not None:
+            pool.stop()
+        if speculation is not None:
+            speculation.close()
+        if backend is not None:
+            backend.close()
+        metrics.log_summary("capture.")
+        metrics.log_summary("devices.")
+        metrics.log_summary("recognizer.")
+        metrics.log_summary("encoder.")
+        metrics.log_summary("cache.")
+        metrics.log_summary("backend.")
+        metrics.log_summary("recognition.")
+        metrics.log_summary("preprocessing.")
         recognition_running = False
-        logging.info("Voice recognition stopped.")
\ No newline at end of file
+        logging.info("Voice recognition stopped.")
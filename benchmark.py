@@ -0,0 +1,234 @@
+"""Startup benchmark. Prints one JSON object so results can be compared between releases.
+
+    python benchmark.py --output startup.json
+
+Builds the real App and records the startup phases it marks itself (widgets,
+first_window, processing_options, device_list, tray, recognition_ready), plus
+the ambient-noise calibration and the per-package import times, including the
+imports made on the recognition thread. Recognition uses the fake backend
+unless --backend is given, so no network is involved.
+
+Without a display (CI), Tk cannot create the window, so the benchmark runs
+App's startup steps without it: the same imports, settings, device list, tray
+import and recognition thread, in the same order. "mode" in the output says
+which of the two ran; only "app" has the widget and first_window phases.
+Steps that fail (no microphone, missing packages) are listed under "errors"
+and the exit code is 1.
+
+--encoders and --recognizers compare upload encodings and recognizer backends
+on the same utterances: the WAV files given with --utterances, or synthetic
+speech-like audio when none are given.
+"""
+# The benchmark's own modules come first so they are not charged to App's startup
+import argparse
+import importlib
+import json
+import logging
+import platform
+import sys
+import threading
+import time
+import wave
+
+from utils import startup  # Then the startup clock and import timer, as at the top of main.py
+startup.install_import_timer()
+
+SCHEMA_VERSION = 2
+
+def timed(step, results, function, *args):
+    started = time.perf_counter()
+    try:
+        return function(*args)
+    except Exception as e:
+        results["errors"][step] = f"{type(e).__name__}: {e}"
+        return None
+    finally:
+        results["timings_ms"][step] = (time.perf_counter() - started) * 1000
+
+def synthetic_utterances(sample_rate, lengths=(0.8, 1.5, 3.0)):
+    """Voiced syllables (a gliding pitch with harmonics) over light noise, one array per length."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    utterances = []
+    for seconds in lengths:
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voice = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 12))
+        syllables = np.clip(np.sin(2 * np.pi * 3.0 * t), 0, None)
+        samples = 6000 * voice * syllables + rng.normal(0, 200, len(t))
+        utterances.append(np.clip(samples, -32768, 32767).astype(np.int16))
+    return utterances
+
+def load_utterances(paths, sample_rate):
+    """16-bit WAV files as int16 mono arrays at sample_rate, or synthetic utterances when no paths are given."""
+    if not paths:
+        return synthetic_utterances(sample_rate)
+    import numpy as np
+    from audio.resampler import resample
+    utterances = []
+    for path in paths:
+        with wave.open(path, "rb") as f:
+            if f.getsampwidth() != 2:
+                raise ValueError(f"{path} is not 16-bit PCM")
+            channels, rate = f.getnchannels(), f.getframerate()
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        utterances.append(resample(samples, rate, sample_rate, channels))
+    return utterances
+
+def run_encoders(utterances, sample_rate):
+    from audio.encoders import AUDIO_ENCODERS, benchmark_encoders
+    return benchmark_encoders([encoder_class() for encoder_class in AUDIO_ENCODERS.values()], utterances, sample_rate)
+
+def run_recognizers(names, utterances, sample_rate):
+    import speech_recognition as sr
+    from config.settings import load_settings
+    from audio.recognizer_backends import RECOGNIZER_BACKENDS, benchmark_backends
+    settings = load_settings()
+    backends = []
+    for name in names:
+        if name not in RECOGNIZER_BACKENDS:
+            raise ValueError(f"Unknown recognizer backend '{name}'")
+        backends.append(RECOGNIZER_BACKENDS[name](settings))
+    try:
+        audio = [sr.AudioData(samples.tobytes(), sample_rate, 2) for samples in utterances]
+        return benchmark_backends(backends, audio, settings.get("language", "en-US"))
+    finally:
+        for backend in backends:
+            backend.close()
+
+def wait_until_ready(thread, timeout, pump=None):
+    """Wait for the recognition_ready startup mark, or for the recognition thread to give up."""
+    from utils import metrics
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and thread is not None and thread.is_alive():
+        if metrics.snapshot("startup.recognition_ready"):
+            return True
+        if pump is not None:
+            pump()
+        time.sleep(0.01)
+    return False
+
+def finish_recognition(thread, ready, results):
+    if "audio.voice_recognition" in sys.modules:
+        sys.modules["audio.voice_recognition"].stop_voice_recognition()
+    if thread is not None:
+        thread.join(timeout=5)
+    if not ready:
+        results["errors"]["recognition"] = "Recognition did not become ready (see log for the cause)."
+    from utils import metrics
+    for step in ("calibration", "ready_to_listen"):  # Recorded by voice_recognition itself
+        timing = metrics.snapshot(f"startup.{step}").get(f"startup.{step}")
+        if timing:
+            results["timings_ms"][step] = timing["last_ms"]
+
+def run_app(main_window, args, results):
+    """Build the App; returns False when there is no display to build it on."""
+    import tkinter as tk
+    load_settings = main_window.load_settings
+    # App reads its settings itself; only the recognizer backend is swapped
+    main_window.load_settings = lambda: dict(load_settings(), recognizer_backend=args.backend)
+    started = time.perf_counter()
+    try:
+        app = main_window.App()
+    except tk.TclError as e:
+        logging.warning(f"No display for the App ({e}), running its startup steps without a window.")
+        return False
+    finally:
+        main_window.load_settings = load_settings
+    results["timings_ms"]["app_init"] = (time.perf_counter() - started) * 1000
+    try:
+        thread = app.voice_recognition_thread
+        ready = not args.skip_recognition and wait_until_ready(thread, args.timeout, app.update)
+        finish_recognition(thread, ready or args.skip_recognition, results)
+    finally:
+        app.on_closing()
+    return True
+
+def recognition_thread(settings, results):
+    # As App._run_voice_recognition: the audio stack is imported on this thread and timed there
+    startup.watch_current_thread()
+    try:
+        from audio.voice_recognition import voice_recognition
+    except Exception as e:
+        results["errors"]["import.audio.voice_recognition"] = f"{type(e).__name__}: {e}"
+        return
+    voice_recognition(settings, on_ready=lambda: startup.mark("recognition_ready"))
+
+def run_headless(args, results):
+    """App.__init__ without the window: the same imports and work, marked with App's phase names."""
+    from config.settings import load_settings
+    settings = timed("load_settings", results, load_settings)
+    startup.mark("settings")
+    device_manager = timed("import.audio.device_manager", results, importlib.import_module, "audio.device_manager")
+    if device_manager is not None:
+        timed("device_list", results, device_manager.list_input_devices)
+    startup.mark("device_list")
+    timed("import.ui.system_tray", results, importlib.import_module, "ui.system_tray")
+    startup.mark("tray")
+    if args.skip_recognition or settings is None:
+        return
+    settings["recognizer_backend"] = args.backend
+    thread = threading.Thread(target=recognition_thread, args=(settings, results), daemon=True)
+    thread.start()
+    finish_recognition(thread, wait_until_ready(thread, args.timeout), results)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Write the JSON here instead of stdout.")
+    parser.add_argument("--backend", default="fake", help="Recognizer backend to start (default: fake).")
+    parser.add_argument("--timeout", type=float, default=15.0, help="Seconds to wait for ready-to-listen.")
+    parser.add_argument("--skip-recognition", action="store_true", help="Do not wait for recognition to start.")
+    parser.add_argument("--array-backends", action="store_true", help="Also measure array backend throughput.")
+    parser.add_argument("--encoders", action="store_true", help="Also measure encoded size and latency per upload encoding.")
+    parser.add_argument("--recognizers", help="Comma-separated recognizer backends to compare, e.g. fake,local.")
+    parser.add_argument("--utterances", nargs="+", default=[], metavar="WAV",
+                        help="Utterances for --encoders and --recognizers (default: synthetic).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    results = {
+        "schema": SCHEMA_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timings_ms": {},
+        "imports_ms": {},
+        "mode": "app",
+        "devices": None,
+        "errors": {},
+    }
+    main_window = timed("import.ui.main_window", results, importlib.import_module, "ui.main_window")
+    startup.mark("imports")
+    if main_window is None or not run_app(main_window, args, results):
+        results["mode"] = "headless"
+        run_headless(args, results)
+    if "audio.device_manager" in sys.modules:
+        results["devices"] = len(sys.modules["audio.device_manager"].get_device_registry().devices)
+
+    if args.array_backends:
+        from audio.array_backend import benchmark_array_backends
+        results["array_backends"] = timed("array_backends", results, benchmark_array_backends)
+
+    if args.encoders or args.recognizers:
+        sample_rate = 16000  # The default recognition rate
+        utterances = timed("load_utterances", results, load_utterances, args.utterances, sample_rate) or []
+        if args.encoders and utterances:
+            results["encoders"] = timed("encoders", results, run_encoders, utterances, sample_rate)
+        if args.recognizers and utterances:
+            names = [name.strip().lower() for name in args.recognizers.split(",") if name.strip()]
+            results["recognizers"] = timed("recognizers", results, run_recognizers, names, utterances, sample_rate)
+
+    report = startup.report()
+    results["imports_ms"] = report["imports"]
+    results["phases_ms"] = {phase: timing["at_ms"] for phase, timing in report["phases"].items()}
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if results["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
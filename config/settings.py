@@ -14,15 +14,45 @@ def load_settings():
         logging.error("Settings file not found. Using default settings.")
         return {
             "last_device_name": "Default Device",
+            "last_device_id": "",
             "noise_reduction": 1.0,
             "sensitivity": 1.0,
             "language": "en-US",
             "shortcuts": {},
             "enable_shortcuts": True,
+            "fuzzy_matching": False,
+            "fuzzy_threshold": 0.75,
+            "shortcut_max_age": 2.0,
             "required_keyword": "",
             "min_audio_length": 1,
             "max_audio_length": 10,
-            "processing_backend": "CPU"
+            "vad_frame_ms": 30,
+            "vad_hangover_ms": 500,
+            "vad_preroll_ms": 300,
+            "vad_tail_ms": 150,
+            "persistent_stream": True,
+            "visualizer_fps": 20,
+            "visualizer_view": "Waveform",
+            "spectrogram_mel_bands": 64,
+            "spectrogram_cpu_budget": 0.05,
+            "target_sample_rate": 16000,
+            "device_watch_interval": 3.0,
+            "device_return_interval": 30.0,
+            "device_probe_quiet": 1.0,
+            "processing_backend": "CPU",
+            "recognizer_backend": "google",
+            "upload_encoding": "auto",
+            "result_cache": False,
+            "result_cache_size": 64,
+            "result_cache_threshold": 0.92,
+            "result_cache_min_confidence": 0.8,
+            "local_server_url": "http://127.0.0.1:8765/recognize",
+            "recognition_workers": 2,
+            "recognition_queue_size": 4,
+            "recognition_queue_policy": "block",
+            "debug_capture": False,
+            "debug_capture_dir": "debug_recordings",
+            "debug_capture_max_mb": 50
         }
 
 def save_settings(settings):
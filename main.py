@@ -1,9 +1,13 @@
+from utils import startup  # First, so the startup clock and import timer cover everything below
+startup.install_import_timer()
+
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 from ui.main_window import App
+startup.mark("imports")
 
 if __name__ == "__main__":
     app = App()
@@ -1,6 +1,22 @@
 import tkinter as tk
-from tkinter import scrolledtext
+from tkinter import scrolledtext, ttk
 import logging
+import queue
+from audio.debug_sink import get_debug_sink
+
+class QueueLogHandler(logging.Handler):
+    """Collects formatted log records so the Tk loop can show them in the debug window."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = queue.Queue(maxsize=1000)
+        self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record):
+        try:
+            self.records.put_nowait(self.format(record))
+        except queue.Full:
+            pass  # The window is not keeping up, drop rather than block the logging thread
 
 class DebugWindow(tk.Toplevel):
     def __init__(self, master):
@@ -10,6 +26,8 @@ class DebugWindow(tk.Toplevel):
             self.geometry("800x600")  # Resize the window
             self.resizable(True, True)  # Allow resizing
             self.create_widgets()
+            self.log_handler = QueueLogHandler()
+            logging.getLogger().addHandler(self.log_handler)
             self.protocol("WM_DELETE_WINDOW", self.on_close)
             self.running = True  # Added flag to indicate the window is running
             self.periodic_update()  # Add periodic update
@@ -18,11 +36,27 @@ class DebugWindow(tk.Toplevel):
 
     def create_widgets(self):
         try:
+            # Toggle for saving recognized utterances to the debug recordings directory
+            self.debug_capture_var = tk.BooleanVar(value=self.master.settings.get("debug_capture", False))
+            debug_capture_checkbutton = ttk.Checkbutton(
+                self, text="Record utterances to disk", variable=self.debug_capture_var,
+                command=self.on_debug_capture_toggled
+            )
+            debug_capture_checkbutton.pack(anchor='w', padx=10, pady=(10, 0))
+
             self.log_text = scrolledtext.ScrolledText(self, state='disabled')
             self.log_text.pack(expand=True, fill='both', padx=10, pady=10)
         except Exception as e:
             logging.error(f"Error creating widgets in DebugWindow: {e}")
 
+    def on_debug_capture_toggled(self):
+        try:
+            enabled = self.debug_capture_var.get()
+            self.master.settings["debug_capture"] = enabled
+            get_debug_sink().set_enabled(enabled)
+        except Exception as e:
+            logging.error(f"Error toggling debug capture: {e}")
+
     def append_log(self, message):
         try:
             self.log_text.configure(state='normal')
@@ -35,6 +69,7 @@ class DebugWindow(tk.Toplevel):
     def on_close(self):
         try:
             self.running = False  # Set flag to False when closing the window
+            logging.getLogger().removeHandler(self.log_handler)
             self.destroy()
             self.master.debug_window = None  # Reset the reference in master
         except Exception as e:
@@ -44,8 +79,9 @@ class DebugWindow(tk.Toplevel):
         if not self.running:
             return  # Exit if the window is no longer running
         try:
-            # Example: Fetch recent logs from a queue or handler
-            # This requires setting up a logging handler that shares logs with DebugWindow
+            # Show log records collected since the last update, including fuzzy match candidates
+            while not self.log_handler.records.empty():
+                self.append_log(self.log_handler.records.get_nowait())
             self.update_idletasks()
             self.after(50, self.periodic_update)  # Schedule the next update
         except Exception as e:
@@ -3,7 +3,7 @@ import tkinter as tk
 from tkinter import ttk
 import pyaudio
 import wave
-from audio.device_manager import list_input_devices, get_device_sample_rate
+from audio.device_manager import list_input_devices, get_device_registry, get_pyaudio
 import threading
 import numpy as np  # Ensure NumPy is imported for audio processing
 
@@ -27,7 +27,10 @@ class DeviceSettings(tk.Toplevel):
     def create_widgets(self):
         device_label = ttk.Label(self, text="Input Device:")
         device_label.pack(pady=5)
-        self.device_var = tk.StringVar(value=self.settings.get("last_device_name", ""))
+        saved_device = get_device_registry().resolve(
+            self.settings.get("last_device_id", ""), self.settings.get("last_device_name", "")
+        )
+        self.device_var = tk.StringVar(value=saved_device.label if saved_device else self.settings.get("last_device_name", ""))
         devices = list_input_devices()
         device_names = [name for _, name in devices]
         self.device_dict = {name: index for index, name in devices}  # Store the mapping
@@ -125,15 +128,16 @@ class DeviceSettings(tk.Toplevel):
 
     def _test_device(self):
         frames = []  # Initialize frames to an empty list
+        p = get_pyaudio()  # Shared PortAudio session, never terminated here
         try:
-            p = pyaudio.PyAudio()
             device_name = self.device_var.get()
             device_id = self.device_dict.get(device_name, None)  # Get the device index
-            if device_id is None:
+            device = get_device_registry().get(device_id)
+            if device is None:
                 logging.error(f"Device '{device_name}' not found.")
                 return
-            sample_rate = get_device_sample_rate(device_id)
-            channels = p.get_device_info_by_index(device_id)["maxInputChannels"]  # Get the max input channels
+            sample_rate = device.rate
+            channels = device.channels  # Get the max input channels
             if channels < 1:
                 logging.error(f"Invalid number of audio channels: {channels}")
                 return
@@ -152,7 +156,6 @@ class DeviceSettings(tk.Toplevel):
         except Exception as e:
             logging.error(f"Error testing device: {e}")
         finally:
-            p.terminate()
             try:
                 if frames:  # Ensure frames is not empty
                     # Convert frames to NumPy array for normalization
@@ -173,7 +176,6 @@ class DeviceSettings(tk.Toplevel):
 
                     # Playback the normalized audio
                     wf = wave.open("test.wav", 'rb')
-                    p = pyaudio.PyAudio()
                     stream = p.open(format=p.get_format_from_width(wf.getsampwidth()), channels=wf.getnchannels(), rate=wf.getframerate(), output=True)
                     data = wf.readframes(1024)
                     while data:
@@ -181,7 +183,6 @@ class DeviceSettings(tk.Toplevel):
                         data = wf.readframes(1024)
                     stream.stop_stream()
                     stream.close()
-                    p.terminate()
             except Exception as e:
                 logging.error(f"Error during audio processing: {e}")
             finally:
@@ -192,6 +193,9 @@ class DeviceSettings(tk.Toplevel):
     def save_settings(self):
         try:
             self.settings["last_device_name"] = self.device_var.get()
+            selected_device = get_device_registry().find_by_label(self.device_var.get())
+            if selected_device:
+                self.settings["last_device_id"] = selected_device.fingerprint  # Survives index reshuffles
             self.settings["sensitivity"] = self.sensitivity_var.get() / 2.0  # Scale 0-2 to 0-1
             self.settings["noise_reduction"] = self.noise_var.get() / 2.0  # Scale 0-2 to 0-1
             
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from audio.device_manager import list_input_devices
+from audio.capture import get_capture_engine
 
 class InputDevicesWindow(tk.Toplevel):
     def __init__(self, master):
@@ -10,8 +11,17 @@ class InputDevicesWindow(tk.Toplevel):
         self.create_widgets()
 
     def create_widgets(self):
-        devices = list_input_devices()
-        device_listbox = tk.Listbox(self)
-        device_listbox.pack(expand=True, fill='both')
-        for index, name in devices:
-            device_listbox.insert(tk.END, f"{index}: {name}")
+        self.device_listbox = tk.Listbox(self)
+        self.device_listbox.pack(expand=True, fill='both')
+        refresh_button = ttk.Button(self, text="Refresh", command=self.refresh_devices)
+        refresh_button.pack(pady=5)
+        self.show_devices()
+
+    def show_devices(self):
+        self.device_listbox.delete(0, tk.END)
+        for index, name in list_input_devices():
+            self.device_listbox.insert(tk.END, f"{index}: {name}")
+
+    def refresh_devices(self):
+        get_capture_engine().rescan_devices()  # PortAudio must reinitialize to see newly attached devices
+        self.show_devices()
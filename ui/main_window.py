@@ -3,12 +3,12 @@ from tkinter import ttk
 import logging
 import threading
 from config.settings import load_settings, save_settings
-from ui.system_tray import setup_tray
-from ui.device_settings import DeviceSettings
-from audio.device_manager import list_input_devices
-from audio.visualizer import AudioVisualizer
-from ui.input_devices import InputDevicesWindow
-from audio.voice_recognition import voice_recognition, stop_voice_recognition
+from utils import startup
+
+# Audio, NumPy, speech_recognition, the tray and the secondary windows are imported
+# where they are first used so the main window appears without waiting for them.
+# This mirrors the keys of RECOGNIZER_BACKENDS for the same reason.
+RECOGNIZER_BACKEND_NAMES = ("google", "local", "fake")
 
 class App(tk.Tk):
     def __init__(self):
@@ -22,6 +22,8 @@ class App(tk.Tk):
         self.debug_window = None  # Reference to DebugWindow (if applicable)
         self.visualizer = None  # Initialize visualizer reference
         self.visualizer_frame = None  # Store reference for later use
+        self.startup_reported = False
+        self.startup_lock = threading.Lock()
 
         try:
             self.settings = load_settings()
@@ -49,9 +51,18 @@ class App(tk.Tk):
             )
             logging.debug(f"Language display: {self.settings['language_display']}")
             self.create_widgets()
+            startup.mark("widgets")
+            self.update()  # Draw the window now instead of after everything below
+            startup.mark("first_window")
+            self.load_processing_options()
+            startup.mark("processing_options")
+            self.load_device_list()
+            startup.mark("device_list")
+            from ui.system_tray import setup_tray
             setup_tray(self)  # Enable system tray
+            startup.mark("tray")
             self.periodic_update()  # Add periodic update
-            self.start_voice_recognition()  # Start voice recognition
+            self.start_voice_recognition()  # Start voice recognition, which reports startup once listening
             logging.info("Application UI initialized.")
         except Exception as e:
             logging.error(f"Error during App initialization: {e}")
@@ -67,15 +78,38 @@ class App(tk.Tk):
                 logging.warning("Voice recognition thread is already running.")
                 return  # Prevent starting another thread
             logging.info("Starting voice recognition thread.")
-            self.voice_recognition_thread = threading.Thread(target=voice_recognition, args=(self.settings,), daemon=True)
+            self.voice_recognition_thread = threading.Thread(
+                target=self._run_voice_recognition, args=(self.settings,), daemon=True
+            )
             self.voice_recognition_thread.start()
             logging.info("Voice recognition thread started.")
         except Exception as e:
             logging.error(f"Error starting voice recognition: {e}")
 
+    def _run_voice_recognition(self, settings):
+        # Imported on this thread so speech_recognition, PyAudio and NumPy never delay the UI,
+        # but still counted in the startup import breakdown
+        startup.watch_current_thread()
+        try:
+            from audio.voice_recognition import voice_recognition
+            voice_recognition(settings, on_ready=self.report_startup)
+        finally:
+            self.report_startup(ready=False)  # No-op if it did start; otherwise report what was measured
+
+    def report_startup(self, ready=True):
+        """Log the startup breakdown once, when recognition first becomes ready to listen."""
+        with self.startup_lock:
+            if self.startup_reported:
+                return
+            self.startup_reported = True
+        if ready:
+            startup.mark("recognition_ready")
+        startup.report()
+
     def restart_voice_recognition(self):
         try:
             logging.info("Restarting voice recognition.")
+            from audio.voice_recognition import stop_voice_recognition
             stop_voice_recognition()  # Stop existing recognition
             if self.voice_recognition_thread:
                 self.voice_recognition_thread.join(timeout=2)  # Ensure thread has stopped
@@ -101,6 +135,10 @@ class App(tk.Tk):
         input_devices_button = ttk.Button(parent, text="Input Devices", command=self.open_input_devices)
         input_devices_button.pack(side='left', padx=5)
 
+    def create_debug_window_button(self, parent):
+        debug_window_button = ttk.Button(parent, text="Debug", command=self.open_debug_window)
+        debug_window_button.pack(side='left', padx=5)
+
     def create_widgets(self):
         main_frame = ttk.Frame(self, padding="10")
         main_frame.pack(expand=True, fill='both')
@@ -111,11 +149,9 @@ class App(tk.Tk):
         device_label = ttk.Label(device_frame, text="Input Device:")
         device_label.grid(row=0, column=0, sticky='w')
         self.device_var = tk.StringVar(value=self.settings.get("last_device_name", ""))
-        devices = list_input_devices()
-        device_names = [name for _, name in devices]
-        device_combobox = ttk.Combobox(device_frame, textvariable=self.device_var, values=device_names)
-        device_combobox.grid(row=0, column=1, sticky='ew')
-        device_combobox.bind("<<ComboboxSelected>>", self.on_device_selected)  # Bind selection event
+        self.device_combobox = ttk.Combobox(device_frame, textvariable=self.device_var)  # Filled by load_device_list
+        self.device_combobox.grid(row=0, column=1, sticky='ew')
+        self.device_combobox.bind("<<ComboboxSelected>>", self.on_device_selected)  # Bind selection event
         device_frame.columnconfigure(1, weight=1)
 
         # Noise Reduction
@@ -154,6 +190,7 @@ class App(tk.Tk):
         self.create_device_list_button(button_frame)
         self.create_visualizer_button(button_frame)
         self.create_input_devices_button(button_frame)
+        self.create_debug_window_button(button_frame)
 
         # Add Audio Length Settings
         audio_length_frame = ttk.LabelFrame(main_frame, text="Audio Length Settings", padding="10")
@@ -190,12 +227,20 @@ class App(tk.Tk):
         processing_label = ttk.Label(processing_frame, text="Select Processing Backend:")
         processing_label.grid(row=0, column=0, sticky='w')
         self.processing_var = tk.StringVar(value=self.settings.get("processing_backend", "CPU"))
-        processing_options = ["CPU", "GPU"]
-        processing_combobox = ttk.Combobox(
-            processing_frame, textvariable=self.processing_var, values=processing_options, state="readonly"
+        # Filled in by load_processing_options once the window is up
+        self.processing_combobox = ttk.Combobox(
+            processing_frame, textvariable=self.processing_var, values=["CPU"], state="readonly"
+        )
+        self.processing_combobox.grid(row=0, column=1, sticky='w')
+        self.processing_combobox.bind("<<ComboboxSelected>>", self.on_processing_selected)
+
+        recognizer_label = ttk.Label(processing_frame, text="Recognizer Backend:")
+        recognizer_label.grid(row=1, column=0, sticky='w', pady=5)
+        self.recognizer_var = tk.StringVar(value=self.settings.get("recognizer_backend", "google"))
+        recognizer_combobox = ttk.Combobox(
+            processing_frame, textvariable=self.recognizer_var, values=list(RECOGNIZER_BACKEND_NAMES), state="readonly"
         )
-        processing_combobox.grid(row=0, column=1, sticky='w')
-        processing_combobox.bind("<<ComboboxSelected>>", self.on_processing_selected)
+        recognizer_combobox.grid(row=1, column=1, sticky='w')
 
         processing_frame.columnconfigure(1, weight=1)
 
@@ -221,6 +266,18 @@ class App(tk.Tk):
         self.required_keyword_var = tk.StringVar(value=self.settings.get("required_keyword", ""))
         required_keyword_entry = ttk.Entry(enable_shortcuts_frame, textvariable=self.required_keyword_var)
         required_keyword_entry.grid(row=1, column=1, sticky='ew')
+
+        # Add Fuzzy Matching Options
+        self.fuzzy_matching_var = tk.BooleanVar(value=self.settings.get("fuzzy_matching", False))
+        fuzzy_matching_checkbutton = ttk.Checkbutton(enable_shortcuts_frame, text="Fuzzy Matching", variable=self.fuzzy_matching_var)
+        fuzzy_matching_checkbutton.grid(row=2, column=0, sticky='w')
+        fuzzy_threshold_label = ttk.Label(enable_shortcuts_frame, text="Fuzzy Threshold:")
+        fuzzy_threshold_label.grid(row=3, column=0, sticky='w')
+        self.fuzzy_threshold_var = tk.DoubleVar(value=self.settings.get("fuzzy_threshold", 0.75))
+        fuzzy_threshold_spinbox = ttk.Spinbox(
+            enable_shortcuts_frame, from_=0.5, to=1.0, increment=0.05, textvariable=self.fuzzy_threshold_var, width=5
+        )
+        fuzzy_threshold_spinbox.grid(row=3, column=1, sticky='w')
         enable_shortcuts_frame.columnconfigure(1, weight=1)
 
         # Add Audio Visualizer Frame
@@ -228,6 +285,16 @@ class App(tk.Tk):
         visualizer_frame.pack(fill='both', expand=True, pady=10)
         self.visualizer_frame = visualizer_frame  # Store reference for later use
 
+    def load_device_list(self):
+        """Enumerate input devices (starting PortAudio) and select the saved one."""
+        from audio.device_manager import list_input_devices, get_device_registry
+        saved_device = get_device_registry().resolve(
+            self.settings.get("last_device_id", ""), self.settings.get("last_device_name", "")
+        )
+        if saved_device:
+            self.device_var.set(saved_device.label)
+        self.device_combobox.config(values=[name for _, name in list_input_devices()])
+
     def validate_audio_lengths(self, *args):
         min_val = self.min_length_var.get()
         max_val = self.max_length_var.get()
@@ -239,6 +306,18 @@ class App(tk.Tk):
         elif max_val > 10:
             self.max_length_var.set(10)
 
+    def load_processing_options(self):
+        """Offer only the processing backends whose packages are installed."""
+        from audio.array_backend import available_array_backends
+        available = available_array_backends()
+        # CPU and GPU pick the best backend of each kind; GPU needs CuPy
+        options = ["CPU"] + (["GPU"] if "cupy" in available else []) + available
+        self.processing_combobox["values"] = options
+        if self.processing_var.get() not in options:
+            logging.warning(f"Processing backend '{self.processing_var.get()}' is not installed. Using CPU.")
+            self.processing_var.set("CPU")
+            self.settings["processing_backend"] = "CPU"  # What recognition would fall back to anyway
+
     def on_processing_selected(self, event):
         selected_backend = self.processing_var.get()
         logging.info(f"Selected processing backend: {selected_backend}")
@@ -267,6 +346,7 @@ class App(tk.Tk):
             self.device_settings_window.deiconify()
             self.device_settings_window.lift()
             return
+        from ui.device_settings import DeviceSettings
         self.device_settings_window = DeviceSettings(self, self.settings)
         self.device_settings_window.protocol("WM_DELETE_WINDOW", self.on_device_settings_close)
 
@@ -325,6 +405,7 @@ class App(tk.Tk):
 
     def _list_devices(self):
         try:
+            from audio.device_manager import list_input_devices
             devices = list_input_devices()
             device_list_window = tk.Toplevel(self)
             device_list_window.title("Input Devices")
@@ -347,12 +428,18 @@ class App(tk.Tk):
         try:
             if not self.visualizer:
                 visualizer_frame = self.visualizer_frame  # Use stored reference
+                from audio.visualizer import AudioVisualizer
                 self.visualizer = AudioVisualizer(
                     parent=visualizer_frame,
                     device_name=self.device_var.get(),
                     processing_backend=self.processing_var.get(),
-                    chunk=1024  # Ensure chunk size matches the plot initialization
+                    chunk=1024,  # Ensure chunk size matches the plot initialization
+                    max_fps=self.settings.get("visualizer_fps", 20),
+                    view=self.settings.get("visualizer_view", "Waveform"),
+                    mel_bands=self.settings.get("spectrogram_mel_bands", 64),
+                    cpu_budget=self.settings.get("spectrogram_cpu_budget", 0.05)
                 )
+                self.visualizer.start()  # Subscribe to the shared capture engine
                 logging.info("AudioVisualizer started and embedded.")
             else:
                 logging.info("AudioVisualizer is already initialized.")
@@ -382,6 +469,7 @@ class App(tk.Tk):
             self.input_devices_window.deiconify()
             self.input_devices_window.lift()
             return
+        from ui.input_devices import InputDevicesWindow
         self.input_devices_window = InputDevicesWindow(self)
         self.input_devices_window.protocol("WM_DELETE_WINDOW", self.on_input_devices_close)
 
@@ -390,6 +478,15 @@ class App(tk.Tk):
             self.input_devices_window.destroy()
             self.input_devices_window = None
 
+    def open_debug_window(self):
+        if self.debug_window and tk.Toplevel.winfo_exists(self.debug_window):
+            logging.info("Debug window already open. Bringing it to focus.")
+            self.debug_window.deiconify()
+            self.debug_window.lift()
+            return
+        from ui.debug_window import DebugWindow
+        self.debug_window = DebugWindow(self)
+
     def periodic_update(self):
         if not self.running:
             return  # Exit if the application is no longer running
@@ -402,13 +499,20 @@ class App(tk.Tk):
     def save_settings(self):
         """Save current settings to the settings file."""
         try:
+            from audio.device_manager import get_device_registry
             self.settings["last_device_name"] = self.device_var.get()
+            selected_device = get_device_registry().find_by_label(self.device_var.get())
+            if selected_device:
+                self.settings["last_device_id"] = selected_device.fingerprint  # Survives index reshuffles
             self.settings["noise_reduction"] = self.noise_var.get()
             self.settings["min_audio_length"] = self.min_length_var.get()
             self.settings["max_audio_length"] = self.max_length_var.get()
             self.settings["processing_backend"] = self.processing_var.get()
+            self.settings["recognizer_backend"] = self.recognizer_var.get()
             self.settings["enable_shortcuts"] = self.enable_shortcuts_var.get()  # Save enable shortcuts setting
             self.settings["required_keyword"] = self.required_keyword_var.get()  # Save required keyword setting
+            self.settings["fuzzy_matching"] = self.fuzzy_matching_var.get()
+            self.settings["fuzzy_threshold"] = self.fuzzy_threshold_var.get()
             save_settings(self.settings)
             logging.info("Settings saved.")
             self.restart_voice_recognition()
@@ -432,9 +536,11 @@ class App(tk.Tk):
             try:
                 self.master = master
                 self.command = command
-                self.shortcut = shortcut or {"description": "", "execute": "", "enable": True, "requireWord": ""}
+                self.shortcut = shortcut or {
+                    "description": "", "execute": "", "enable": True, "requireWord": "", "keyDelay": 50, "postDelay": 100
+                }
                 self.title("Edit Shortcut" if command else "Add Shortcut")
-                self.geometry("400x400")  # Increased size for more UI elements
+                self.geometry("400x520")  # Increased size for more UI elements
                 self.resizable(False, False)
 
                 # Voice Command Entry
@@ -467,6 +573,16 @@ class App(tk.Tk):
                 self.require_word_entry = ttk.Entry(self, textvariable=self.require_word_var)
                 self.require_word_entry.pack(pady=5, fill='x', padx=10)
 
+                # Timing: delay after each key/string and after the whole shortcut, 0 for none
+                timing_frame = ttk.Frame(self)
+                timing_frame.pack(pady=5)
+                ttk.Label(timing_frame, text="Key Delay (ms):").grid(row=0, column=0, sticky='w')
+                self.key_delay_var = tk.IntVar(value=self.shortcut.get("keyDelay", 50))
+                ttk.Spinbox(timing_frame, from_=0, to=1000, increment=10, textvariable=self.key_delay_var, width=6).grid(row=0, column=1, padx=5)
+                ttk.Label(timing_frame, text="Post Delay (ms):").grid(row=1, column=0, sticky='w')
+                self.post_delay_var = tk.IntVar(value=self.shortcut.get("postDelay", 100))
+                ttk.Spinbox(timing_frame, from_=0, to=1000, increment=10, textvariable=self.post_delay_var, width=6).grid(row=1, column=1, padx=5)
+
                 # Add/Edit Button
                 action_button = ttk.Button(self, text="Edit" if command else "Add", command=self.on_add_edit)
                 action_button.pack(pady=10)
@@ -506,7 +622,11 @@ class App(tk.Tk):
                 "<hello world>",
                 "<goodbye>",
                 "[ctrl] + [a]",
-                "[ctrl] + [z]"
+                "[ctrl] + [z]",
+                "wait(500)",
+                "repeat(3) { [down] }",
+                "[shift] { [end] }",
+                "@"
             ]
 
         def show_autocomplete_menu(self, suggestions):
@@ -541,6 +661,12 @@ class App(tk.Tk):
             execute = self.execute_var.get().strip()
             enable = self.enable_var.get()
             require_word = self.require_word_var.get().strip()
+            try:
+                key_delay = max(int(self.key_delay_var.get()), 0)
+                post_delay = max(int(self.post_delay_var.get()), 0)
+            except (tk.TclError, ValueError):
+                logging.warning("Delays must be whole numbers of milliseconds.")
+                return
 
             if not command or not execute:
                 logging.warning("Command and execution fields cannot be empty.")
@@ -550,6 +676,13 @@ class App(tk.Tk):
                 logging.warning("Cannot change the command of an existing shortcut.")
                 return
 
+            # Reject shortcuts that would only fail later when the command fires
+            from utils.macros import validate_macro
+            parse_error = validate_macro(execute, self.master.settings.get("shortcuts", {}), command)
+            if parse_error:
+                logging.warning(f"Invalid keyboard shortcut: {parse_error}")
+                return
+
             if command in self.master.settings.get("shortcuts", {}) and not self.command:
                 logging.warning(f"Shortcut '{command}' already exists.")
                 return
@@ -559,7 +692,9 @@ class App(tk.Tk):
                 "description": description,
                 "execute": execute,
                 "enable": enable,
-                "requireWord": require_word
+                "requireWord": require_word,
+                "keyDelay": key_delay,
+                "postDelay": post_delay
             }
             self.master.load_shortcuts()
             self.master.save_settings()
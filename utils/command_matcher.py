@@ -0,0 +1,83 @@
+# command_matcher.py
+import collections
+import logging
+
+def normalize_phrase(text):
+    """Lowercase and collapse whitespace so phrases compare the way users expect."""
+    return " ".join(text.lower().split())
+
+class CommandMatcher:
+    """Aho-Corasick automaton over the enabled shortcut phrases.
+
+    Built once per shortcut set; ``match`` scans the recognized text a single time
+    and finds every phrase it contains. The longest matching phrase wins, ties go to
+    the shortcut defined first, and shortcuts whose ``requireWord`` the text does not
+    start with are skipped.
+    """
+
+    def __init__(self, shortcuts):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.entries = []  # (command, shortcut, normalized required word, phrase length)
+        for command, shortcut in shortcuts.items():
+            phrase = normalize_phrase(command)
+            if not shortcut.get("enable", True) or not phrase:
+                continue
+            self._insert(phrase, len(self.entries))
+            self.entries.append((command, shortcut, normalize_phrase(shortcut.get("requireWord", "")), len(phrase)))
+        self._build_failure_links()
+        logging.info(f"Command matcher compiled for {len(self.entries)} shortcuts ({len(self.goto)} states).")
+
+    def _insert(self, phrase, entry_id):
+        state = 0
+        for char in phrase:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(entry_id)
+
+    def _build_failure_links(self):
+        pending = collections.deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                # Phrases ending at the fallback state also end here
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find_all(self, text):
+        """Return the ids of every shortcut phrase contained in the normalized text."""
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found.update(self.output[state])
+        return found
+
+    def match(self, command):
+        """Return (command, shortcut) for the best phrase in the recognized text, or None."""
+        text = normalize_phrase(command)
+        best = None
+        for entry_id in sorted(self.find_all(text)):
+            phrase, shortcut, require_word, length = self.entries[entry_id]
+            if require_word and not text.startswith(require_word):
+                logging.warning(f"Command does not start with the required keyword: {shortcut['requireWord']}")
+                continue
+            if best is None or length > self.entries[best][3]:
+                best = entry_id
+        if best is None:
+            return None
+        return self.entries[best][0], self.entries[best][1]
@@ -0,0 +1,130 @@
+# fuzzy_matcher.py
+import collections
+import heapq
+import logging
+import re
+from utils.command_matcher import normalize_phrase
+
+# Spelling patterns that sound alike, applied in order before vowels are dropped
+_PHONETIC_RULES = [
+    (re.compile(r"[^a-z0-9]"), ""),
+    (re.compile(r"^(kn|gn|pn|wr)"), lambda m: m.group(1)[1]),
+    (re.compile(r"^x"), "s"),
+    (re.compile(r"^wh"), "w"),
+    (re.compile(r"gh(?=[^aeiou]|$)"), ""),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck"), "k"),
+    (re.compile(r"sch"), "sk"),
+    (re.compile(r"th"), "0"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"dg"), "j"),
+    (re.compile(r"(?<=[a-z])[aeiouyhw]"), ""),
+    (re.compile(r"^[aeiouy]"), "a"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+def phonetic_key(word):
+    """Rough sound-alike key: "right"/"write" and "to"/"two" map to the same key."""
+    key = word.lower()
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+FuzzyCandidate = collections.namedtuple(
+    "FuzzyCandidate", ["command", "score", "trigram_score", "phonetic_score", "coverage"]
+)
+
+class FuzzyIndex:
+    """Inverted index of trigrams and phonetic word keys over the enabled shortcut phrases.
+
+    Hits are counted by walking the posting lists of the text's trigrams and
+    phonetic keys, and only shortcuts whose hit counts can reach the threshold are
+    turned into candidates, so lookups stay well under a millisecond with
+    thousands of commands even though common grams like " co" are shared by most
+    of them. A shortcut's score is the larger of the fraction of its trigrams
+    found in the text (spelling slips) and the fraction of its word sounds found
+    (homophones).
+
+    A short phrase contained in a longer one scores as high as the longer one,
+    so ties go to the shortcut that accounts for more of the text (``coverage``),
+    then to the longer phrase, like the longest match rule of CommandMatcher.
+    """
+
+    def __init__(self, shortcuts):
+        self.entries = []  # (command, shortcut, trigrams, phonetic keys)
+        self.gram_sizes = []  # Per entry, for pruning without unpacking entries
+        self.key_sizes = []
+        self.shortcuts = shortcuts
+        self.trigram_index = collections.defaultdict(list)
+        self.phonetic_index = collections.defaultdict(list)
+        for command, shortcut in shortcuts.items():
+            phrase = normalize_phrase(command)
+            if not shortcut.get("enable", True) or not phrase:
+                continue
+            entry_id = len(self.entries)
+            grams = trigrams(phrase)
+            keys = {phonetic_key(word) for word in phrase.split()} - {""}
+            for gram in grams:
+                self.trigram_index[gram].append(entry_id)
+            for key in keys:
+                self.phonetic_index[key].append(entry_id)
+            self.entries.append((command, shortcut, grams, keys))
+            self.gram_sizes.append(len(grams))
+            self.key_sizes.append(len(keys))
+        logging.info(f"Fuzzy index built for {len(self.entries)} shortcuts.")
+
+    def candidates(self, command, limit=5, threshold=0.0):
+        """Return the best scoring shortcuts for the recognized text, highest score first.
+
+        Shortcuts scoring below ``threshold`` are dropped before any candidate is built.
+        """
+        text = normalize_phrase(command)
+        grams = trigrams(text)
+        keys = {phonetic_key(word) for word in text.split()} - {""}
+        gram_hits = collections.Counter()
+        key_hits = collections.Counter()
+        for gram in grams:
+            gram_hits.update(self.trigram_index.get(gram, ()))
+        for key in keys:
+            key_hits.update(self.phonetic_index.get(key, ()))
+
+        gram_sizes, key_sizes = self.gram_sizes, self.key_sizes
+        scored = []
+        for entry_id in gram_hits.keys() | key_hits.keys():
+            if (threshold and gram_hits[entry_id] / gram_sizes[entry_id] < threshold
+                    and (not key_sizes[entry_id] or key_hits[entry_id] / key_sizes[entry_id] < threshold)):
+                continue
+            command_name, _, entry_grams, entry_keys = self.entries[entry_id]
+            trigram_score = gram_hits[entry_id] / len(entry_grams)
+            phonetic_score = key_hits[entry_id] / len(entry_keys) if entry_keys else 0.0
+            score = max(trigram_score, phonetic_score)
+            coverage = max(gram_hits[entry_id] / len(grams), key_hits[entry_id] / len(keys) if keys else 0.0)
+            candidate = FuzzyCandidate(command_name, score, trigram_score, phonetic_score, coverage)
+            scored.append(((score, coverage, len(entry_grams)), candidate))
+        return [candidate for _, candidate in heapq.nlargest(limit, scored, key=lambda item: item[0])]
+
+    def match(self, command, threshold=0.75):
+        """Return (command, shortcut, candidates) for the best candidate above the threshold."""
+        text = normalize_phrase(command)
+        candidates = self.candidates(command, threshold=threshold)
+        logging.info("Fuzzy candidates: " + (", ".join(
+            f"'{c.command}' {c.score:.2f} (trigram {c.trigram_score:.2f}, phonetic {c.phonetic_score:.2f})"
+            for c in candidates
+        ) or "none"))
+        for candidate in candidates:
+            if candidate.score < threshold:
+                break
+            shortcut = self.shortcuts[candidate.command]
+            require_word = normalize_phrase(shortcut.get("requireWord", ""))
+            if require_word and not text.startswith(require_word):
+                continue
+            return candidate.command, shortcut, candidates
+        return None
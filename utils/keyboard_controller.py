@@ -3,56 +3,140 @@ import keyboard
 import logging
 import time
 import re
+import collections
+import functools
+import threading
+from utils import metrics
 
-def execute_shortcut(shortcut):
-    try:
-        parts = [part.strip() for part in shortcut.split('+')]
-        modifiers = []
-        keys = []
-        strings = []
-
-        for part in parts:
-            # Check for modifier keys like [ctrl], [shift], [alt], [win]
-            modifier_match = re.match(r'\[(.*?)\]', part)
-            if modifier_match:
-                modifier = modifier_match.group(1).lower()
-                if modifier in ['ctrl', 'shift', 'alt', 'win']:
-                    modifiers.append(modifier)
-                continue
+MODIFIERS = ('ctrl', 'shift', 'alt', 'win')
 
-            # Check for typing strings like <hello world>
-            string_match = re.match(r'<(.*?)>', part)
-            if string_match:
-                string_to_type = string_match.group(1)
-                strings.append(string_to_type)
-                continue
+# One "+"-separated part: [key], <text to type>, or anything else (rejected)
+_PART_PATTERN = re.compile(r'\s*(?:\[([^\]]*)\]|<([^>]*)>|([^+]+?))\s*(?:\+|$)')
 
-            # Check for single keys like [a], [s], [1], etc.
-            key_match = re.match(r'\[(.*?)\]', part)
-            if key_match:
-                key = key_match.group(1).lower()
-                keys.append(key)
-                continue
+ShortcutOp = collections.namedtuple("ShortcutOp", ["action", "argument"])  # press, release, type or wait
+
+class ShortcutParseError(ValueError):
+    pass
 
-        # Press and hold modifier keys
-        for mod in modifiers:
-            keyboard.press(mod)
+@functools.lru_cache(maxsize=512)
+def compile_shortcut(shortcut, key_delay=0.05, post_delay=0.1):
+    """Parse a shortcut string into an immutable tuple of ShortcutOps.
 
-        # Execute key presses
-        for key in keys:
-            keyboard.press_and_release(key)
-            time.sleep(0.05)  # Small delay between key presses
+    Modifiers are held for the whole shortcut, keys are tapped in order, then
+    strings are typed, then modifiers are released in reverse order. ``key_delay``
+    is waited after every key and string and ``post_delay`` once at the end, both
+    in seconds; zero delays produce no wait ops.
+    """
+    modifiers = []
+    keys = []
+    strings = []
+    position = 0
+    while position < len(shortcut):
+        if not shortcut[position:].strip():
+            if position:
+                raise ShortcutParseError(f"Shortcut '{shortcut}' ends with '+'.")
+            break
+        part_match = _PART_PATTERN.match(shortcut, position)
+        if not part_match or part_match.end() == position:
+            raise ShortcutParseError(f"Cannot parse shortcut '{shortcut}' at position {position}.")
+        key, string_to_type, unknown = part_match.groups()
+        if unknown is not None:
+            raise ShortcutParseError(f"Unrecognized part '{unknown}' in shortcut '{shortcut}'. Use [key] or <text>.")
+        if key is not None:
+            key = key.strip().lower()
+            if not key:
+                raise ShortcutParseError(f"Empty key in shortcut '{shortcut}'.")
+            # Check for modifier keys like [ctrl], [shift], [alt], [win]; other keys like [a], [f4] are tapped
+            (modifiers if key in MODIFIERS else keys).append(key)
+        else:
+            strings.append(string_to_type)
+        position = part_match.end()
+    if not (modifiers or keys or strings):
+        raise ShortcutParseError("Shortcut is empty.")
 
-        # Type out strings
-        for string in strings:
-            keyboard.write(string)
-            time.sleep(0.05)  # Small delay between typing
+    key_wait = [ShortcutOp("wait", key_delay)] if key_delay > 0 else []
+    ops = [ShortcutOp("press", mod) for mod in modifiers]
+    for key in keys:
+        ops += [ShortcutOp("press", key), ShortcutOp("release", key)] + key_wait
+    for string in strings:
+        ops += [ShortcutOp("type", string)] + key_wait
+    ops += [ShortcutOp("release", mod) for mod in reversed(modifiers)]
+    if post_delay > 0:
+        ops.append(ShortcutOp("wait", post_delay))  # Small delay after executing shortcuts
+    return tuple(ops)
 
-        # Release modifier keys
-        for mod in reversed(modifiers):
-            keyboard.release(mod)
+def run_program(program):
+    for op in program:
+        if op.action == "press":
+            keyboard.press(op.argument)
+        elif op.action == "release":
+            keyboard.release(op.argument)
+        elif op.action == "type":
+            keyboard.write(op.argument)
+        elif op.action == "wait":
+            time.sleep(op.argument)
 
-        time.sleep(0.1)  # Add a small delay after executing shortcuts
-        logging.info(f"Executed shortcut: {shortcut}")
+def execute_program(program, label):
+    try:
+        run_program(program)
+        logging.info(f"Executed shortcut: {label}")
     except Exception as e:
-        logging.error(f"Error executing shortcut '{shortcut}': {e}")
\ No newline at end of file
+        logging.error(f"Error executing shortcut '{label}': {e}")
+
+def execute_shortcut(shortcut, key_delay=0.05, post_delay=0.1):
+    try:
+        program = compile_shortcut(shortcut, key_delay, post_delay)
+    except ShortcutParseError as e:
+        logging.error(f"Error executing shortcut '{shortcut}': {e}")
+        return
+    execute_program(program, shortcut)
+
+class ShortcutExecutor:
+    """Runs compiled shortcut programs on a dedicated thread so their delays never hold up recognition.
+
+    Requests older than ``max_age`` seconds when their turn comes are dropped, and a
+    program that is already waiting in the queue is not queued a second time.
+    """
+
+    def __init__(self, max_age=2.0):
+        self.max_age = max_age
+        self.pending = collections.deque()  # (program, label, queued_at)
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="shortcut-executor", daemon=True)
+        self.thread.start()
+
+    def configure(self, settings):
+        self.max_age = settings.get("shortcut_max_age", 2.0)
+
+    def submit(self, program, label):
+        with self.condition:
+            if any(pending[0] == program for pending in self.pending):
+                metrics.increment("shortcuts.coalesced")
+                logging.info(f"Shortcut '{label}' is already queued, coalescing.")
+                return
+            self.pending.append((program, label, time.perf_counter()))
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                program, label, queued_at = self.pending.popleft()
+            age = time.perf_counter() - queued_at
+            metrics.record_time("shortcuts.queue_wait", age)
+            if self.max_age and age > self.max_age:
+                metrics.increment("shortcuts.stale_dropped")
+                logging.warning(f"Dropped stale shortcut '{label}' after {age:.2f}s in the queue.")
+                continue
+            execute_program(program, label)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_shortcut_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ShortcutExecutor()
+        return _executor
@@ -0,0 +1,162 @@
+# macros.py
+import re
+import logging
+from utils.keyboard_controller import ShortcutOp, ShortcutParseError, compile_shortcut
+
+# Macro language, compiled into the same ops as plain shortcuts:
+#   step ; step ; ...        run steps in sequence
+#   [ctrl] + [c]             a plain shortcut (modifiers, [keys] and <text>)
+#   wait(250)                pause for 250 ms
+#   repeat(3) { ... }        run the enclosed steps three times
+#   [shift] { ... }          hold a key while the enclosed steps run (can be nested)
+#   @copy all / @{copy all}  run the shortcut saved for another voice command
+
+_WAIT_PATTERN = re.compile(r'wait\s*\(\s*(\d+)\s*\)')
+_REPEAT_PATTERN = re.compile(r'repeat\s*\(\s*(\d+)\s*\)\s*\{')
+_HOLD_PATTERN = re.compile(r'\[([^\]]+)\]\s*\{')
+
+MAX_REPEAT = 100
+MAX_OPS = 10000  # Guards against repeat/reference combinations that explode
+
+class _MacroParser:
+    def __init__(self, text, compiler, key_delay, stack):
+        self.text = text
+        self.compiler = compiler
+        self.key_delay = key_delay
+        self.stack = stack  # Commands being expanded, to detect reference cycles
+        self.position = 0
+
+    def error(self, message):
+        raise ShortcutParseError(f"{message} (at position {self.position} in '{self.text}')")
+
+    def skip_whitespace(self):
+        while self.position < len(self.text) and self.text[self.position].isspace():
+            self.position += 1
+
+    def parse_sequence(self, in_block=False):
+        ops = []
+        while True:
+            self.skip_whitespace()
+            if self.position >= len(self.text):
+                if in_block:
+                    self.error("Missing '}'")
+                return ops
+            if self.text[self.position] == '}':
+                if not in_block:
+                    self.error("Unexpected '}'")
+                self.position += 1
+                return ops
+            ops += self.parse_step()
+            if len(ops) > MAX_OPS:
+                self.error(f"Macro expands to more than {MAX_OPS} actions")
+            self.skip_whitespace()
+            if self.position < len(self.text) and self.text[self.position] == ';':
+                self.position += 1
+            elif self.position < len(self.text) and self.text[self.position] != '}':
+                self.error("Expected ';' between steps")
+
+    def parse_step(self):
+        wait_match = _WAIT_PATTERN.match(self.text, self.position)
+        if wait_match:
+            self.position = wait_match.end()
+            return [ShortcutOp("wait", int(wait_match.group(1)) / 1000)]
+
+        repeat_match = _REPEAT_PATTERN.match(self.text, self.position)
+        if repeat_match:
+            count = int(repeat_match.group(1))
+            if not 1 <= count <= MAX_REPEAT:
+                self.error(f"Repeat count must be between 1 and {MAX_REPEAT}")
+            self.position = repeat_match.end()
+            return self.parse_sequence(in_block=True) * count
+
+        hold_match = _HOLD_PATTERN.match(self.text, self.position)
+        if hold_match:
+            key = hold_match.group(1).strip().lower()
+            self.position = hold_match.end()
+            body = self.parse_sequence(in_block=True)
+            return [ShortcutOp("press", key)] + body + [ShortcutOp("release", key)]
+
+        if self.text[self.position] == '@':
+            return self.parse_reference()
+
+        return self.parse_chord()
+
+    def parse_reference(self):
+        self.position += 1
+        if self.text.startswith('{', self.position):
+            end = self.text.find('}', self.position)
+            if end < 0:
+                self.error("Missing '}' after '@{'")
+            name = self.text[self.position + 1:end].strip()
+            self.position = end + 1
+        else:
+            end = self.position
+            while end < len(self.text) and self.text[end] not in ';}':
+                end += 1
+            name = self.text[self.position:end].strip()
+            self.position = end
+        if not name:
+            self.error("Missing command name after '@'")
+        return list(self.compiler.expand_reference(name, self.key_delay, self.stack))
+
+    def parse_chord(self):
+        # A plain shortcut runs until the next ';' or '}' outside of [key] and <text>
+        start = self.position
+        closing = None
+        while self.position < len(self.text):
+            char = self.text[self.position]
+            if closing:
+                if char == closing:
+                    closing = None
+            elif char == '[':
+                closing = ']'
+            elif char == '<':
+                closing = '>'
+            elif char in ';}':
+                break
+            self.position += 1
+        chord = self.text[start:self.position].strip()
+        if not chord:
+            self.error("Empty step")
+        return list(compile_shortcut(chord, self.key_delay, 0))
+
+class MacroCompiler:
+    """Compiles shortcut macros against one set of shortcuts, caching the results.
+
+    A shortcut without macro syntax compiles to the same program as
+    compile_shortcut, so every saved shortcut can go through the compiler.
+    """
+
+    def __init__(self, shortcuts):
+        self.shortcuts = shortcuts
+        self.cache = {}
+
+    def compile(self, text, key_delay=0.05, post_delay=0.1, command=None):
+        key = (text, key_delay, post_delay)
+        program = self.cache.get(key)
+        if program is None:
+            stack = (command,) if command else ()
+            ops = _MacroParser(text, self, key_delay, stack).parse_sequence()
+            if post_delay > 0:
+                ops.append(ShortcutOp("wait", post_delay))
+            program = self.cache[key] = tuple(ops)
+        return program
+
+    def expand_reference(self, name, key_delay, stack):
+        if name in stack:
+            raise ShortcutParseError(f"Shortcut '{name}' refers to itself: {' -> '.join(stack + (name,))}")
+        shortcut = self.shortcuts.get(name)
+        if shortcut is None:
+            raise ShortcutParseError(f"Unknown shortcut '@{name}'")
+        return _MacroParser(shortcut["execute"], self, key_delay, stack + (name,)).parse_sequence()
+
+def validate_macro(text, shortcuts, command=None):
+    """Return an error message if the macro cannot be compiled, else None."""
+    try:
+        MacroCompiler(shortcuts).compile(text, command=command)
+        return None
+    except ShortcutParseError as e:
+        return str(e)
+    except Exception as e:
+        logging.error(f"Unexpected error validating macro '{text}': {e}")
+        return str(e)
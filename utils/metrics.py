@@ -0,0 +1,47 @@
+# metrics.py
+import logging
+import threading
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}  # name -> [count, total, last, max] in seconds
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def record_time(name, seconds):
+    with _lock:
+        timing = _timings.setdefault(name, [0, 0.0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = seconds
+        timing[3] = max(timing[3], seconds)
+
+def snapshot(prefix=""):
+    """Return counters and timings (in milliseconds) whose name starts with prefix."""
+    with _lock:
+        result = {name: value for name, value in _counters.items() if name.startswith(prefix)}
+        for name, (count, total, last, peak) in _timings.items():
+            if name.startswith(prefix):
+                result[name] = {
+                    "count": count,
+                    "avg_ms": total / count * 1000 if count else 0.0,
+                    "last_ms": last * 1000,
+                    "max_ms": peak * 1000,
+                }
+        return result
+
+def reset(prefix=""):
+    with _lock:
+        for store in (_counters, _timings):
+            for name in [name for name in store if name.startswith(prefix)]:
+                del store[name]
+
+def log_summary(prefix=""):
+    for name, value in sorted(snapshot(prefix).items()):
+        if isinstance(value, dict):
+            logging.info(f"Metric {name}: count={value['count']} avg={value['avg_ms']:.1f}ms "
+                         f"last={value['last_ms']:.1f}ms max={value['max_ms']:.1f}ms")
+        else:
+            logging.info(f"Metric {name}: {value}")
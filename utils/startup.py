@@ -0,0 +1,106 @@
+# startup.py
+import builtins
+import logging
+import sys
+import threading
+import time
+from utils import metrics
+
+# Import this module first; everything is timed from here
+_started = time.perf_counter()
+_phases = []  # (name, seconds since start)
+
+class ImportTimer:
+    """Measures how long each module takes to import on the watched threads.
+
+    Wraps builtins.__import__ while installed. Every module loaded for the first
+    time is charged its own time, excluding the modules it imports itself, like
+    ``python -X importtime`` does. The installing thread is watched; threads that
+    import heavy modules at startup (recognition loads NumPy and
+    speech_recognition) add themselves with ``watch_current_thread``.
+    """
+
+    def __init__(self):
+        self.self_times = {}  # module name -> seconds
+        self.local = threading.local()  # .stack: [name, seconds spent in nested imports] per import in progress
+        self.lock = threading.Lock()
+        self.original_import = None
+        self.installed = False
+        self.thread_ids = set()
+
+    def install(self):
+        self.original_import = builtins.__import__
+        self.installed = True
+        self.watch_current_thread()
+        builtins.__import__ = self._import
+
+    def watch_current_thread(self):
+        self.thread_ids.add(threading.get_ident())
+
+    def uninstall(self):
+        # original_import stays set: another watched thread may be inside _import right now
+        if self.installed:
+            builtins.__import__ = self.original_import
+            self.installed = False
+            self.thread_ids.clear()
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules or threading.get_ident() not in self.thread_ids:
+            return self.original_import(name, globals, locals, fromlist, level)
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append([name, 0.0])
+        started = time.perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            _, nested = stack.pop()
+            with self.lock:
+                self.self_times[name] = self.self_times.get(name, 0.0) + elapsed - nested
+            if stack:
+                stack[-1][1] += elapsed
+
+    def by_package(self):
+        """Self time summed per top-level package, slowest first."""
+        totals = {}
+        with self.lock:
+            self_times = list(self.self_times.items())
+        for name, seconds in self_times:
+            package = name.partition(".")[0]
+            totals[package] = totals.get(package, 0.0) + seconds
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+_import_timer = ImportTimer()
+
+def install_import_timer():
+    _import_timer.install()
+
+def watch_current_thread():
+    """Also time the imports made on the calling thread, until report() runs."""
+    if _import_timer.installed:
+        _import_timer.watch_current_thread()
+
+def mark(phase):
+    """Record that a startup phase finished, as seconds since startup began."""
+    elapsed = time.perf_counter() - _started
+    _phases.append((phase, elapsed))
+    metrics.record_time(f"startup.{phase}", elapsed)
+    return elapsed
+
+def elapsed():
+    return time.perf_counter() - _started
+
+def report(top=10):
+    """Stop timing imports, log the startup breakdown and return it as a dict (times in ms)."""
+    _import_timer.uninstall()
+    phases = {}
+    previous = 0.0
+    for phase, at in _phases:
+        phases[phase] = {"at_ms": at * 1000, "took_ms": (at - previous) * 1000}
+        previous = at
+    imports = {package: seconds * 1000 for package, seconds in list(_import_timer.by_package().items())[:top]}
+    logging.info("Startup: " + ", ".join(
+        f"{phase} at {timing['at_ms']:.0f} ms (+{timing['took_ms']:.0f})" for phase, timing in phases.items()
+    ))
+    logging.info("Slowest imports: " + ", ".join(f"{package} {ms:.0f} ms" for package, ms in imports.items()))
+    return {"phases": phases, "imports": imports}